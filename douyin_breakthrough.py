@@ -14,19 +14,104 @@ import os
 import re
 import time
 import json
+import hashlib
 import requests
 import subprocess
 import tempfile
 import random
+import uuid
+import queue
+import threading
+import logging
+import logging.handlers
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urlparse, unquote
+from requests.adapters import HTTPAdapter
+
+from whisper_manager import preload_model, require_model, transcribe, detect_speech
+from extract_utils import scan_re, scan, parse_vtt, discard_audio
+
+# Span from an object's opening brace to the wanted key.  re2 never
+# backtracks, so the plain class is linear there (and counted repeats bloat
+# its DFA); the backtracking re engine gets a lazy 1000-char cap so an
+# object without the key can't drag each attempt across the page.
+_OBJ_SPAN = r'[^}]*' if scan_re is not re else r'[^}]{0,1000}?'
+
+# Extraction patterns, each fused into one alternation so a page is scanned
+# once.  Every branch has exactly one named group (the captured value), so
+# ``m.lastgroup`` says which pattern matched; group order is priority order.
+_API_VIDEO_URL_RE = scan_re.compile(
+    r'"play_addr":\{' + _OBJ_SPAN + r'"url_list":\["(?P<play_addr>[^"]+)"'
+    r'|"download_addr":\{' + _OBJ_SPAN + r'"url_list":\["(?P<download_addr>[^"]+)"'
+    r'|"url":"(?P<mp4_url>[^"]*\.mp4[^"]*)'
+    r'|"video_url":"(?P<video_url>[^"]+)"'
+)
+
+# Enhanced patterns for 2024 Douyin structure
+_PAGE_VIDEO_URL_RE = scan_re.compile(
+    r'"playAddr":\[\{"src":"(?P<play_addr_src>[^"]+)"'
+    r'|"download_addr":\{"url_list":\["(?P<download_addr>[^"]+)"'
+    r'|"play_addr":\{"url_list":\["(?P<play_addr>[^"]+)"'
+    r'|"url":"(?P<share_mp4>[^"]*v\.douyin\.com[^"]*\.mp4[^"]*)'
+    r'|"src":"(?P<aweme_mp4>[^"]*aweme[^"]*\.mp4[^"]*)'
+    r'|videoUrl":"(?P<video_url>[^"]+)"'
+)
+
+# Title patterns in priority order.  Searched one by one rather than fused:
+# in one alternation the aweme_detail branch would consume the video's own
+# "desc" and leave the plain desc pattern the next, unrelated one.
+_PAGE_TITLE_RES = (
+    scan_re.compile(r'"desc":"([^"]+)"'),
+    scan_re.compile(r'<title[^>]*>([^<]+)</title>'),
+    scan_re.compile(r'"aweme_detail":\{' + _OBJ_SPAN + r'"desc":"([^"]+)"'),
+)
+
+
+def _page_title(content):
+    """First usable title (over 5 chars) from *content*, by pattern priority."""
+    for pattern in _PAGE_TITLE_RES:
+        match = pattern.search(content)
+        if match:
+            title = match.group(1).strip()
+            if len(title) > 5:
+                return title[:100]
+    return "Douyin Video"
+
+
+# Video ID forms, tried in order
+_VIDEO_ID_RES = (
+    re.compile(r'/video/(\d+)'),
+    re.compile(r'modal_id=(\d+)'),
+    re.compile(r'/(\d+)/?$'),
+    re.compile(r'v\.douyin\.com/([A-Za-z0-9]+)'),
+)
+_TEXT_URL_RE = re.compile(r'http[s]?://[^\s<>"]+')
+_TITLE_RE = re.compile(r'<title[^>]*>([^<]+)</title>')
+
+# Per-request header overrides; requests merges them over the session
+# headers itself, so no per-call copy of the session headers is needed.
+_API_EXTRA = {
+    'Referer': 'https://www.douyin.com/',
+    'Origin': 'https://www.douyin.com',
+    'X-Requested-With': 'XMLHttpRequest'
+}
+_PAGE_EXTRA = {
+    'Referer': 'https://www.douyin.com/',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
+}
+
+# Scrape results (video URLs, title, author) are reused across runs for this long
+CACHE_TTL = 6 * 60 * 60  # seconds
 
-from whisper_manager import preload_model, require_model
 
 class DouyinBreakthrough:
     def __init__(self, whisper_model='small'):
         self.temp_dir = tempfile.mkdtemp(prefix='douyin_')
         self.session = requests.Session()
         self.whisper_model = whisper_model
+        self.logger = logging.getLogger(__name__)
+        # Outside temp_dir, which cleanup() removes after every run
+        self.cache_dir = os.path.join(tempfile.gettempdir(), 'douyin_cache')
 
         # Chinese-friendly user agents
         self.user_agents = [
@@ -54,26 +139,114 @@ class DouyinBreakthrough:
             'Upgrade-Insecure-Requests': '1',
             'Cache-Control': 'no-cache'
         })
+
+        # Keep-alive pools sized for the concurrent API probes across the
+        # douyin.com / iesdouyin.com / snssdk.com hosts.
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
     
+    def _cache_path(self, video_id):
+        return os.path.join(self.cache_dir, hashlib.sha1(video_id.encode()).hexdigest() + '.json')
+
+    def _cache_get(self, video_id):
+        """Return the cached extraction result for *video_id*, or None if missing/stale."""
+        try:
+            with open(self._cache_path(video_id), encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get('timestamp', 0) > CACHE_TTL:
+            return None
+        return entry.get('result')
+
+    def _cache_put(self, video_id, result):
+        """Write *result* to the on-disk cache atomically (temp file + rename)."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._cache_path(video_id)
+            tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'timestamp': time.time(), 'result': result}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.warning(f"⚠️ Could not write cache: {e}")
+
     def _extract_video_id(self, url):
         """Extract video ID from Douyin URL"""
-        patterns = [
-            r'/video/(\d+)',
-            r'modal_id=(\d+)',
-            r'/(\d+)/?$',
-            r'v\.douyin\.com/([A-Za-z0-9]+)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, url)
+        for pattern in _VIDEO_ID_RES:
+            match = pattern.search(url)
             if match:
                 return match.group(1)
         return None
     
+    def _probe_api_endpoint(self, api_url, seen, seen_lock):
+        """Fetch one Douyin API endpoint; return a result dict or None.
+
+        *seen* holds fingerprints of bodies already parsed by sibling probes.
+        """
+        response = self.session.get(api_url, headers=_API_EXTRA, timeout=15)
+        
+        if response.status_code == 200:
+            # Mirror hosts often answer with the very same (usually empty or
+            # blocked) body — parse each distinct body only once.
+            fingerprint = hashlib.blake2b(response.content, digest_size=8).digest()
+            with seen_lock:
+                if fingerprint in seen:
+                    return None
+                seen.add(fingerprint)
+
+            try:
+                data = response.json()
+                
+                if 'aweme_list' in data and data['aweme_list']:
+                    aweme = data['aweme_list'][0]
+                    
+                    # Extract video info
+                    title = aweme.get('desc', 'Douyin Video')
+                    author = aweme.get('author', {}).get('nickname', '')
+                    
+                    # Extract video URLs
+                    video_urls = []
+                    if 'video' in aweme:
+                        video_info = aweme['video']
+                        
+                        # Try different video quality URLs
+                        url_keys = ['play_addr', 'download_addr', 'play_addr_lowbr']
+                        for url_key in url_keys:
+                            if url_key in video_info and 'url_list' in video_info[url_key]:
+                                video_urls.extend(video_info[url_key]['url_list'])
+                    
+                    if video_urls:
+                        return {
+                            'success': True,
+                            'method': 'api-reverse-engineering',
+                            'title': title,
+                            'author': author,
+                            'video_urls': video_urls,
+                            'api_endpoint': api_url
+                        }
+                        
+            except json.JSONDecodeError:
+                # Maybe it's not JSON, try to parse as text
+                content = response.text
+                
+                # Look for video URLs in response text
+                for matches in scan(_API_VIDEO_URL_RE, content).values():
+                    if matches:
+                        return {
+                            'success': True,
+                            'method': 'api-text-extraction',
+                            'video_urls': matches,
+                            'api_endpoint': api_url
+                        }
+        
+        return None
+
     def method_api_reverse_engineering(self, video_id):
         """Try to reverse engineer Douyin API endpoints"""
         try:
-            print("🔍 API reverse engineering attack...")
+            self.logger.info("🔍 API reverse engineering attack...")
             
             # Common Douyin API endpoints
             api_endpoints = [
@@ -83,85 +256,34 @@ class DouyinBreakthrough:
                 f"https://aweme-eagle.snssdk.com/aweme/v1/play/?video_id={video_id}"
             ]
             
-            for api_url in api_endpoints:
-                try:
-                    # Add Chinese headers
-                    headers = self.session.headers.copy()
-                    headers.update({
-                        'Referer': 'https://www.douyin.com/',
-                        'Origin': 'https://www.douyin.com',
-                        'X-Requested-With': 'XMLHttpRequest'
-                    })
-                    
-                    response = self.session.get(api_url, headers=headers, timeout=15)
-                    
-                    if response.status_code == 200:
-                        try:
-                            data = response.json()
-                            
-                            if 'aweme_list' in data and data['aweme_list']:
-                                aweme = data['aweme_list'][0]
-                                
-                                # Extract video info
-                                title = aweme.get('desc', 'Douyin Video')
-                                author = aweme.get('author', {}).get('nickname', '')
-                                
-                                # Extract video URLs
-                                video_urls = []
-                                if 'video' in aweme:
-                                    video_info = aweme['video']
-                                    
-                                    # Try different video quality URLs
-                                    url_keys = ['play_addr', 'download_addr', 'play_addr_lowbr']
-                                    for url_key in url_keys:
-                                        if url_key in video_info and 'url_list' in video_info[url_key]:
-                                            video_urls.extend(video_info[url_key]['url_list'])
-                                
-                                if video_urls:
-                                    return {
-                                        'success': True,
-                                        'method': 'api-reverse-engineering',
-                                        'title': title,
-                                        'author': author,
-                                        'video_urls': video_urls,
-                                        'api_endpoint': api_url
-                                    }
-                                    
-                        except json.JSONDecodeError:
-                            # Maybe it's not JSON, try to parse as text
-                            content = response.text
-                            
-                            # Look for video URLs in response text
-                            video_patterns = [
-                                r'"play_addr":{[^}]*"url_list":\["([^"]+)"',
-                                r'"download_addr":{[^}]*"url_list":\["([^"]+)"',
-                                r'"url":"([^"]*\.mp4[^"]*)',
-                                r'"video_url":"([^"]+)"'
-                            ]
-                            
-                            for pattern in video_patterns:
-                                matches = re.findall(pattern, content)
-                                if matches:
-                                    return {
-                                        'success': True,
-                                        'method': 'api-text-extraction',
-                                        'video_urls': matches,
-                                        'api_endpoint': api_url
-                                    }
-                                    
-                except Exception as e:
-                    print(f"API endpoint {api_url} failed: {e}")
-                    continue
+            # The endpoints live on different hosts, each with its own TLS
+            # handshake — probe them all at once and take the first hit.
+            seen, seen_lock = set(), threading.Lock()
+            pool = ThreadPoolExecutor(max_workers=len(api_endpoints))
+            futures = {pool.submit(self._probe_api_endpoint, api_url, seen, seen_lock): api_url
+                       for api_url in api_endpoints}
+            try:
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        self.logger.warning(f"API endpoint {futures[future]} failed: {e}")
+                        continue
+                    if result:
+                        return result
+            finally:
+                # Don't wait for slower hosts once we have an answer
+                pool.shutdown(wait=False, cancel_futures=True)
                     
         except Exception as e:
-            print(f"API reverse engineering failed: {e}")
+            self.logger.warning(f"API reverse engineering failed: {e}")
         
         return {'success': False}
     
     def method_douyin_webapp_scraping(self, video_id):
         """Scrape Douyin web app"""
         try:
-            print("🔍 Web app scraping attack...")
+            self.logger.info("🔍 Web app scraping attack...")
             
             # Try different Douyin URLs
             douyin_urls = [
@@ -172,49 +294,18 @@ class DouyinBreakthrough:
             
             for url in douyin_urls:
                 try:
-                    headers = self.session.headers.copy()
-                    headers.update({
-                        'Referer': 'https://www.douyin.com/',
-                        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
-                    })
-                    
-                    response = self.session.get(url, headers=headers, timeout=20)
+                    response = self.session.get(url, headers=_PAGE_EXTRA, timeout=20)
                     
                     if response.status_code == 200:
                         content = response.text
                         
-                        # Enhanced patterns for 2024 Douyin structure
-                        video_patterns = [
-                            r'"playAddr":\[{"src":"([^"]+)"',
-                            r'"download_addr":{"url_list":\["([^"]+)"',
-                            r'"play_addr":{"url_list":\["([^"]+)"',
-                            r'"url":"([^"]*v\.douyin\.com[^"]*\.mp4[^"]*)',
-                            r'"src":"([^"]*aweme[^"]*\.mp4[^"]*)',
-                            r'videoUrl":"([^"]+)"'
-                        ]
-                        
                         found_urls = []
-                        for pattern in video_patterns:
-                            matches = re.findall(pattern, content)
+                        for matches in scan(_PAGE_VIDEO_URL_RE, content).values():
                             for match in matches:
                                 if 'http' in match:
                                     found_urls.append(match)
                         
-                        # Title extraction
-                        title_patterns = [
-                            r'"desc":"([^"]+)"',
-                            r'<title[^>]*>([^<]+)</title>',
-                            r'"aweme_detail":{[^}]*"desc":"([^"]+)"'
-                        ]
-                        
-                        title = "Douyin Video"
-                        for pattern in title_patterns:
-                            match = re.search(pattern, content)
-                            if match:
-                                potential_title = match.group(1).strip()
-                                if len(potential_title) > 5:
-                                    title = potential_title[:100]
-                                    break
+                        title = _page_title(content)
                         
                         if found_urls:
                             return {
@@ -226,18 +317,18 @@ class DouyinBreakthrough:
                             }
                             
                 except Exception as e:
-                    print(f"Douyin URL {url} failed: {e}")
+                    self.logger.warning(f"Douyin URL {url} failed: {e}")
                     continue
                     
         except Exception as e:
-            print(f"Web app scraping failed: {e}")
+            self.logger.warning(f"Web app scraping failed: {e}")
         
         return {'success': False}
     
     def method_you_get_enhanced(self, url):
         """Enhanced you-get with better error handling"""
         try:
-            print("🔍 Enhanced you-get attack...")
+            self.logger.info("🔍 Enhanced you-get attack...")
             
             # Try you-get with different parameters
             you_get_commands = [
@@ -280,7 +371,7 @@ class DouyinBreakthrough:
                             # Parse as text output
                             if 'http' in output:
                                 # Extract URLs from text
-                                url_matches = re.findall(r'http[s]?://[^\s<>"]+', output)
+                                url_matches = _TEXT_URL_RE.findall(output)
                                 video_urls = [url for url in url_matches if '.mp4' in url or 'video' in url]
                                 
                                 if video_urls:
@@ -291,116 +382,115 @@ class DouyinBreakthrough:
                                     }
                                     
                 except subprocess.TimeoutExpired:
-                    print(f"you-get command timed out: {cmd}")
+                    self.logger.warning(f"you-get command timed out: {cmd}")
                     continue
                 except Exception as e:
-                    print(f"you-get command failed: {e}")
+                    self.logger.warning(f"you-get command failed: {e}")
                     continue
                     
         except Exception as e:
-            print(f"Enhanced you-get failed: {e}")
+            self.logger.warning(f"Enhanced you-get failed: {e}")
         
         return {'success': False}
     
-    @staticmethod
-    def _parse_vtt(raw):
-        """Convert VTT/SRT subtitle content to clean plain text."""
-        lines, seen = [], set()
-        for line in raw.splitlines():
-            line = line.strip()
-            if not line or line.startswith(('WEBVTT', 'Kind:', 'Language:', 'NOTE', 'STYLE')):
-                continue
-            if '-->' in line or line.isdigit():
-                continue
-            clean = re.sub(r'<[^>]+>', '', line).strip()
-            if clean and clean not in seen:
-                lines.append(clean)
-                seen.add(clean)
-            if len(seen) > 200:
-                seen.clear()
-        return '\n'.join(lines)
-
     def _check_subtitles(self, url):
         """Try fetching existing subtitles via yt-dlp before heavier methods."""
         try:
-            cmd = [
-                'yt-dlp', '--js-runtimes', 'node',
-                '--remote-components', 'ejs:github',
-                '--write-subs', '--write-auto-subs',
-                '--sub-lang', 'zh,en', '--skip-download',
-                '--paths', self.temp_dir,
-                '-o', '%(id)s.%(ext)s',
-                url
-            ]
-            subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            for f in os.listdir(self.temp_dir):
-                if f.endswith(('.vtt', '.srt', '.ass')):
-                    sub_path = os.path.join(self.temp_dir, f)
-                    with open(sub_path, 'r', encoding='utf-8') as fh:
-                        raw = fh.read()
-                    os.remove(sub_path)
-                    content = self._parse_vtt(raw)
-                    if len(content.strip()) > 20:
-                        return {
-                            'success': True,
-                            'title': 'Douyin Video',
-                            'transcript': content,
-                            'source': 'douyin_yt-dlp_subs',
-                            'language': 'zh'
-                        }
+            from yt_dlp import YoutubeDL
+
+            ydl_opts = {
+                'js_runtimes': {'node': {}},
+                'remote_components': ['ejs:github'],
+                'writesubtitles': True,
+                'writeautomaticsub': True,
+                'subtitleslangs': ['zh', 'en'],
+                'subtitlesformat': 'vtt/srt/ass/best',
+                'skip_download': True,
+                'quiet': True,
+                'no_warnings': True,
+                'socket_timeout': 30,
+            }
+            # Metadata only — the subtitle tracks are fetched into memory
+            # below instead of being written to temp_dir and read back.
+            with YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=False)
+            for sub in (info.get('requested_subtitles') or {}).values():
+                if sub.get('ext') not in ('vtt', 'srt', 'ass'):
+                    continue
+                raw = sub.get('data')
+                if raw is None:
+                    response = self.session.get(sub['url'], timeout=15)
+                    if response.status_code != 200:
+                        continue
+                    raw = response.text
+                content = parse_vtt(raw)
+                if len(content.strip()) > 20:
+                    return {
+                        'success': True,
+                        'title': 'Douyin Video',
+                        'transcript': content,
+                        'source': 'douyin_yt-dlp_subs',
+                        'language': 'zh'
+                    }
         except Exception:
             pass
         return None
 
     def extract_douyin_breakthrough(self, url):
         """Main Douyin extraction method"""
-        print(f"🚀 Douyin Breakthrough Attack: {url}")
+        self.logger.info(f"🚀 Douyin Breakthrough Attack: {url}")
 
         # --- Subtitle-first: fast path ---
         sub_result = self._check_subtitles(url)
         if sub_result:
-            print("✅ Subtitles found — skipping heavy extraction")
+            self.logger.info("✅ Subtitles found — skipping heavy extraction")
             return sub_result
 
         video_id = self._extract_video_id(url)
         if not video_id:
-            print("⚠️ Could not extract video ID, trying with full URL")
+            self.logger.warning("⚠️ Could not extract video ID, trying with full URL")
             video_id = url  # Use full URL as fallback
         else:
-            print(f"🎯 Video ID: {video_id}")
+            self.logger.info(f"🎯 Video ID: {video_id}")
 
-        # Attack methods
-        methods = [
-            lambda: self.method_api_reverse_engineering(video_id),
-            lambda: self.method_douyin_webapp_scraping(video_id),
-            lambda: self.method_you_get_enhanced(url)
-        ]
-        
-        successful_method = None
+        # A rerun (e.g. after a failed transcription) skips straight to
+        # downloading with the URLs scraped last time.
+        successful_method = self._cache_get(video_id)
+        if successful_method:
+            self.logger.info("⚡ Using cached extraction result")
+            methods = []
+        else:
+            # Attack methods
+            methods = [
+                lambda: self.method_api_reverse_engineering(video_id),
+                lambda: self.method_douyin_webapp_scraping(video_id),
+                lambda: self.method_you_get_enhanced(url)
+            ]
         
         for i, method in enumerate(methods, 1):
             method_name = method.__code__.co_name.replace('method_', '') if hasattr(method, '__code__') else f"method_{i}"
-            print(f"\n🔥 Douyin Attack {i}: {method_name}")
+            self.logger.info(f"🔥 Douyin Attack {i}: {method_name}")
             
             try:
                 result = method()
                 if result['success']:
-                    print(f"✅ Attack {i} BREAKTHROUGH!")
+                    self.logger.info(f"✅ Attack {i} BREAKTHROUGH!")
                     successful_method = result
+                    self._cache_put(video_id, result)
                     break
                 else:
-                    print(f"❌ Attack {i} blocked")
+                    self.logger.warning(f"❌ Attack {i} blocked")
             except Exception as e:
-                print(f"💥 Attack {i} error: {e}")
+                self.logger.warning(f"💥 Attack {i} error: {e}")
                 continue
         
         if not successful_method:
             # Fallback: basic title extraction
             try:
-                print("\n🔄 Fallback: Basic title extraction")
+                self.logger.info("🔄 Fallback: Basic title extraction")
                 response = self.session.get(url, timeout=15)
                 if response.status_code == 200:
-                    title_match = re.search(r'<title[^>]*>([^<]+)</title>', response.text)
+                    title_match = _TITLE_RE.search(response.text)
                     title = title_match.group(1).strip() if title_match else "Douyin Video"
                     
                     return {
@@ -420,31 +510,69 @@ class DouyinBreakthrough:
         video_urls = successful_method.get('video_urls', [])
         author = successful_method.get('author', '')
         
-        print(f"📝 Title: {title}")
-        print(f"👤 Author: {author}")
-        print(f"🎬 Video URLs found: {len(video_urls)}")
+        self.logger.info(f"📝 Title: {title}")
+        self.logger.info(f"👤 Author: {author}")
+        self.logger.info(f"🎬 Video URLs found: {len(video_urls)}")
         
         # Try transcription
         transcript = None
         successful_video_url = None
-        
-        for i, video_url in enumerate(video_urls):
-            print(f"\n🎯 Transcribing URL {i+1}/{len(video_urls)}: {video_url[:60]}...")
+
+        # Overlap downloads (network + ffmpeg) with transcription (GPU): a
+        # producer thread fetches the next candidate while the current one
+        # is transcribed.  maxsize=2 bounds how far ahead it can run.
+        ready = queue.Queue(maxsize=2)
+        stop = threading.Event()
+
+        def _produce():
+            # The sentinel must go out whatever happens, or the loop below
+            # blocks on ready.get() forever
+            try:
+                for video_url in video_urls:
+                    if stop.is_set():
+                        break
+                    try:
+                        audio_file = self._download_and_extract_audio(video_url)
+                        if audio_file is not None:
+                            audio_file = self._check_speech(audio_file)
+                    except Exception as e:
+                        self.logger.warning(f"❌ Audio preparation failed: {e}")
+                        audio_file = None
+                    ready.put((video_url, audio_file))
+            finally:
+                ready.put(None)
+
+        threading.Thread(target=_produce, daemon=True).start()
+
+        i = 0
+        while True:
+            item = ready.get()
+            if item is None:
+                break
+            video_url, audio_file = item
+            i += 1
+
+            # Already have a transcript — just drain what the producer had
+            # in flight so it can exit.
+            if stop.is_set():
+                discard_audio(audio_file)
+                continue
+
+            self.logger.info(f"🎯 Transcribing URL {i}/{len(video_urls)}: {video_url[:60]}...")
             
             try:
-                audio_file = self._download_and_extract_audio(video_url)
-                if audio_file:
+                if audio_file is not None:
                     transcript = self._transcribe_audio(audio_file)
                     if transcript and len(transcript.strip()) > 20:
                         successful_video_url = video_url
-                        print(f"🎉 DOUYIN TRANSCRIPTION SUCCESS!")
-                        break
+                        self.logger.info(f"🎉 DOUYIN TRANSCRIPTION SUCCESS!")
+                        stop.set()
                     else:
-                        print(f"⚠️ Transcript too short")
+                        self.logger.warning(f"⚠️ Transcript too short")
                 else:
-                    print(f"❌ Audio extraction failed")
+                    self.logger.warning(f"❌ No usable audio")
             except Exception as e:
-                print(f"❌ Processing error: {e}")
+                self.logger.warning(f"❌ Processing error: {e}")
                 continue
         
         # Final result
@@ -461,7 +589,7 @@ class DouyinBreakthrough:
             result['source'] = 'douyin_breakthrough_whisper'
             result['successful_video_url'] = successful_video_url[:60] + '...'
             result['language'] = 'zh'
-            print(f"\n🏆 DOUYIN VICTORY! {len(transcript)} chars transcribed!")
+            self.logger.info(f"🏆 DOUYIN VICTORY! {len(transcript)} chars transcribed!")
         else:
             metadata = f"Douyin Video: {title}"
             if author:
@@ -470,14 +598,56 @@ class DouyinBreakthrough:
             
             result['transcript'] = metadata
             result['source'] = 'douyin_breakthrough_metadata'
-            print(f"\n⚠️ PARTIAL: URLs found but transcription failed")
+            self.logger.warning(f"⚠️ PARTIAL: URLs found but transcription failed")
         
         return result
     
+    @staticmethod
+    def _decode_audio_stream(response):
+        """Decode an HTTP media stream to 16kHz mono float32 PCM with PyAV."""
+        import av
+        import numpy as np
+
+        response.raw.decode_content = True
+        resampler = av.AudioResampler(format='flt', layout='mono', rate=16000)
+        chunks = []
+        with av.open(response.raw, mode='r', metadata_errors='ignore') as container:
+            for frame in container.decode(audio=0):
+                for resampled in resampler.resample(frame):
+                    chunks.append(resampled.to_ndarray().reshape(-1))
+            for resampled in resampler.resample(None):  # flush
+                chunks.append(resampled.to_ndarray().reshape(-1))
+
+        if not chunks:
+            return None
+        return np.concatenate(chunks)
+
+    def _check_speech(self, audio):
+        """Decode *audio* and run VAD on it; None (file removed) if nothing is said.
+
+        Runs on the download thread, so rejecting a music-only candidate
+        costs no Whisper time at all.
+        """
+        try:
+            speech = detect_speech(audio)
+        except Exception as e:
+            self.logger.warning(f"⚠️ VAD check failed, transcribing anyway: {e}")
+            return audio
+        # Either way the decoded array replaces the file on disk
+        discard_audio(audio)
+        if speech is None:
+            self.logger.info(f"🔇 No speech detected — skipping candidate")
+        return speech
+
     def _download_and_extract_audio(self, video_url):
-        """Download and extract audio from Douyin video (16kHz mono wav)"""
+        """Download and extract audio from Douyin video.
+
+        Returns a 16kHz mono wav path (yt-dlp) or a float32 sample array
+        (direct-download fallback); both are accepted by Whisper.
+        """
         try:
-            audio_file = os.path.join(self.temp_dir, f"douyin_audio_{int(time.time())}.wav")
+            # Unique name: candidates are downloaded concurrently
+            audio_file = os.path.join(self.temp_dir, f"douyin_audio_{int(time.time())}_{uuid.uuid4().hex[:8]}.wav")
 
             # yt-dlp with Douyin-specific settings — 16kHz mono for Whisper
             cmd = [
@@ -501,39 +671,23 @@ class DouyinBreakthrough:
                     if os.path.exists(test_file):
                         return test_file
             
-            # Direct download fallback
+            # Direct download fallback — decode the HTTP stream in-process
+            # with PyAV: no .mp4 on disk and no ffmpeg subprocess.
             headers = {
                 'User-Agent': random.choice(self.user_agents),
                 'Referer': 'https://www.douyin.com/',
                 'Accept': '*/*'
             }
 
-            video_file = audio_file.replace('.wav', '.mp4')
-            response = self.session.get(video_url, headers=headers, stream=True, timeout=30)
-
-            if response.status_code in [200, 206]:
-                with open(video_file, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-
-                # Extract audio — 16kHz mono wav
-                ffmpeg_cmd = [
-                    'ffmpeg', '-i', video_file,
-                    '-vn', '-acodec', 'pcm_s16le', '-ar', '16000', '-ac', '1', '-y',
-                    audio_file
-                ]
-                
-                ffmpeg_result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True, timeout=30)
-                
-                if os.path.exists(video_file):
-                    os.remove(video_file)
-                
-                if ffmpeg_result.returncode == 0 and os.path.exists(audio_file):
-                    return audio_file
+            with self.session.get(video_url, headers=headers, stream=True,
+                                  timeout=30) as response:
+                if response.status_code in [200, 206]:
+                    audio = self._decode_audio_stream(response)
+                    if audio is not None:
+                        return audio
             
         except Exception as e:
-            print(f"❌ Douyin download failed: {e}")
+            self.logger.warning(f"❌ Douyin download failed: {e}")
         
         return None
     
@@ -544,18 +698,13 @@ class DouyinBreakthrough:
             return None
 
         try:
-            result = whisper.transcribe(audio_file, language="zh")
-            transcript = result["text"].strip()
-            
-            if os.path.exists(audio_file):
-                os.remove(audio_file)
-            
+            transcript = transcribe(whisper, audio_file, language="zh", batch_size=16)
+            discard_audio(audio_file)
             return transcript
             
         except Exception as e:
-            print(f"❌ Douyin transcription failed: {e}")
-            if os.path.exists(audio_file):
-                os.remove(audio_file)
+            self.logger.warning(f"❌ Douyin transcription failed: {e}")
+            discard_audio(audio_file)
             return None
     
     def cleanup(self):
@@ -573,10 +722,22 @@ def main():
         sys.exit(1)
     
     url = sys.argv[1]
+
+    # Progress logging is buffered and written out in one go when the
+    # extraction returns, so the scraping loop never blocks on the terminal.
+    handler = logging.handlers.MemoryHandler(
+        1024, flushLevel=logging.ERROR, target=logging.StreamHandler())
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger = logging.getLogger(__name__)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
     extractor = DouyinBreakthrough()
     
     try:
         result = extractor.extract_douyin_breakthrough(url)
+        handler.flush()
         
         if result['success']:
             print(f"\n🎉 DOUYIN BREAKTHROUGH SUCCESSFUL!")
@@ -600,6 +761,7 @@ def main():
     
     finally:
         extractor.cleanup()
+        handler.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,76 @@
+"""
+Helpers shared by the platform extractors.
+
+Usage:
+    from extract_utils import scan_re, scan, parse_vtt, discard_audio
+    pattern = scan_re.compile(r'"a":"(?P<a>[^"]+)"|"b":"(?P<b>[^"]+)"')
+    urls = scan(pattern, page)      # {'a': [...], 'b': [...]}
+    text = parse_vtt(raw_vtt)       # plain text, repeated cue lines dropped
+    discard_audio(audio)            # remove a temp file (arrays are ignored)
+"""
+
+import os
+import re
+from collections import deque
+
+try:
+    # google-re2: linear-time automaton, no per-branch backtracking over
+    # multi-MB pages.  Same compile/finditer/lastgroup API as re.
+    import re2 as scan_re
+except ImportError:
+    scan_re = re
+
+# VTT inline tags like <00:00:00.240><c>...</c>
+_TAG_RE = re.compile(r'<[^>]+>')
+# One cue text line: not blank, not a header/metadata line, not a cue
+# number, not a timestamp line.  Captures the line without outer whitespace.
+_CUE_RE = re.compile(
+    r'^[ \t]*(?!WEBVTT|Kind:|Language:|NOTE|STYLE|\d+[ \t\r]*$)(?![^\n]*-->)'
+    r'(\S[^\n]*?)[ \t\r]*$',
+    re.MULTILINE,
+)
+# Distinct lines remembered for dedup; a line may repeat once it has aged out
+_VTT_DEDUP_WINDOW = 256
+
+
+def scan(pattern, content: str) -> dict:
+    """Single ``finditer`` pass; return ``{group: [matches]}`` in pattern order.
+
+    *pattern* is a fused alternation whose every branch has exactly one
+    named group, so ``m.lastgroup`` says which branch matched.
+    """
+    # re2 reports groupindex sorted by name, so order by group number
+    groups = sorted(pattern.groupindex, key=pattern.groupindex.get)
+    buckets = {name: [] for name in groups}
+    for m in pattern.finditer(content):
+        buckets[m.lastgroup].append(m.group(m.lastgroup))
+    return buckets
+
+
+def parse_vtt(raw: str) -> str:
+    """Convert VTT/SRT subtitle content to clean plain text."""
+    # Dedup window: hashes of the last _VTT_DEDUP_WINDOW distinct lines
+    lines, recent, seen = [], deque(), set()
+    # Tags are stripped from the whole buffer at once, then one regex
+    # pass picks out the cue text lines (headers, timestamps, cue
+    # numbers and blank lines never reach Python).
+    for clean in _CUE_RE.findall(_TAG_RE.sub('', raw)):
+        # VTT repeats each line across overlapping cues
+        h = hash(clean)
+        if h in seen:
+            continue
+        lines.append(clean)
+        if len(recent) == _VTT_DEDUP_WINDOW:
+            seen.discard(recent.popleft())
+        recent.append(h)
+        seen.add(h)
+    return '\n'.join(lines)
+
+
+def discard_audio(audio) -> None:
+    """Delete *audio* if it is a file on disk (decoded arrays need nothing)."""
+    if isinstance(audio, str):
+        try:
+            os.remove(audio)
+        except OSError:
+            pass
@@ -12,22 +12,145 @@ Facebook Direct Attack: Bypass restrictions với mobile tricks + API reverse en
 
 import os
 import re
+import codecs
+import shutil
 import time
 import json
 import requests
 import subprocess
 import tempfile
+import threading
+import functools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urlparse, unquote, parse_qs
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import base64
 import random
 
-from whisper_manager import preload_model, require_model
+from whisper_manager import preload_model, require_model, transcribe
+from extract_utils import scan_re, scan, parse_vtt, discard_audio
+
+# Compiled once at import instead of going through re's cache on every call
+_VIDEO_ID_PATTERNS = [re.compile(p) for p in (
+    r'/videos/(\d+)',
+    r'v=(\d+)',
+    r'/(\d+)/?$',
+    r'/watch/?\?v=(\d+)',
+    r'/reel/(\d+)'
+)]
+
+# Video URL patterns (fixed), fused into one case-insensitive alternation so
+# the page is scanned once.  Each branch has exactly one named group, so
+# ``m.lastgroup`` says which pattern matched; group order is priority order.
+_VIDEO_URL_RE = scan_re.compile(
+    r'(?i)"playable_url":"(?P<playable_url>[^"]+)"'
+    r'|"src":"(?P<src_mp4>[^"]+\.mp4[^"]*)'
+    r'|"hd_src":"(?P<hd_src>[^"]+)"'
+    r'|"sd_src":"(?P<sd_src>[^"]+)"'
+    r'|"url":"(?P<scontent_mp4>[^"]*scontent[^"]*\.mp4[^"]*)'
+    r'|"url":"(?P<fbcdn_mp4>[^"]*fbcdn[^"]*\.mp4[^"]*)'
+    r'|"contentUrl":"(?P<content_url>[^"]+\.mp4[^"]*)'
+    r'|"video_url":"(?P<video_url>[^"]+)"'
+)
+
+# High-priority player fields: one of these, once usable, ends a streamed
+# page read early (see FacebookDirectAttack._read_page)
+_EARLY_STOP_GROUPS = frozenset(('playable_url', 'hd_src', 'sd_src'))
+
+
+def _clean_video_url(match):
+    """Unescape a JSON-embedded URL; return it, or None if it isn't a video URL."""
+    url = match.replace('\\/', '/').replace('\\u0026', '&')
+    if 'http' in url and ('.mp4' in url or 'video' in url):
+        return url
+    return None
+
+
+# Structured JSON on the page: ld+json script blocks are parsed whole, and
+# each "videoData": value is decoded as exactly one JSON object/array from
+# where it starts — no regex has to guess where a nested object ends.
+_LD_JSON_RE = re.compile(
+    r'<script[^>]*type="application/ld\+json"[^>]*>(.*?)</script>',
+    re.IGNORECASE | re.DOTALL)
+_VIDEO_DATA_RE = re.compile(r'"videoData":\s*', re.IGNORECASE)
+_JSON_DECODER = json.JSONDecoder()
+_JSON_VIDEO_KEYS = frozenset(('playable_url', 'playable_url_quality_hd', 'hd_src',
+                              'sd_src', 'contentUrl', 'video_url'))
+
+
+def _walk_json(node, keys):
+    """Return every string value stored under one of *keys* anywhere in *node*."""
+    found, pending = [], deque([node])
+    while pending:
+        node = pending.popleft()
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key in keys and isinstance(value, str):
+                    found.append(value)
+                elif isinstance(value, (dict, list)):
+                    pending.append(value)
+        elif isinstance(node, list):
+            pending.extend(node)
+    return found
+
+
+def _json_video_urls(content):
+    """Video URLs from the page's ld+json blocks and videoData objects."""
+    urls = []
+    for m in _LD_JSON_RE.finditer(content):
+        try:
+            urls.extend(_walk_json(json.loads(m.group(1)), _JSON_VIDEO_KEYS))
+        except ValueError:
+            continue
+    for m in _VIDEO_DATA_RE.finditer(content):
+        try:
+            data, _end = _JSON_DECODER.raw_decode(content, m.end())
+        except ValueError:
+            continue  # not JSON here, or cut off by the streamed read
+        urls.extend(_walk_json(data, _JSON_VIDEO_KEYS | {'url'}))
+    return urls
+
+
+# Title sources in order of preference, fused like _VIDEO_URL_RE
+_TITLE_RE = scan_re.compile(
+    r'(?i)<title[^>]*>(?P<title>[^<]+)</title>'
+    r'|property="og:title"[^>]*content="(?P<og_title>[^"]+)"'
+    r'|"title":"(?P<json_title>[^"]+)"'
+)
+
+# Per-request header overrides; requests merges them over the session
+# headers itself, so no per-call copy of the session headers is needed.
+_MOBILE_EXTRA = {
+    'Referer': 'https://www.google.com/',
+    'Origin': 'https://m.facebook.com'
+}
+_DOWNLOAD_EXTRA = {
+    'Referer': 'https://m.facebook.com/',
+    'Accept': '*/*'
+}
+
+# Files yt-dlp may leave in temp_dir
+_SUBTITLE_EXTS = ('.vtt', '.srt', '.ass')
+_AUDIO_EXTS = ('.wav', '.mp3', '.m4a', '.webm')
+
+# Mobile pages are read until the first video URL; give up after this much
+_MAX_PAGE_BYTES = 1024 * 1024
+
 
 class FacebookDirectAttack:
-    def __init__(self, whisper_model='small'):
+    def __init__(self, whisper_model='small', defer_whisper=False):
         self.temp_dir = tempfile.mkdtemp(prefix='fb_direct_')
         self.session = requests.Session()
         self.whisper_model = whisper_model
+        # With defer_whisper the model only starts loading once the subtitle
+        # fast path has missed, so subtitle-only runs never pay for it.  The
+        # one-shot CLI (main) defers; long-lived callers like the server
+        # keep the default and load up front.
+        self.defer_whisper = defer_whisper
+        # share URL -> resolved video URL; spares yt-dlp on retries
+        self._resolved_cache: dict[str, str] = {}
 
         # Multiple realistic mobile user agents
         self.user_agents = [
@@ -36,7 +159,8 @@ class FacebookDirectAttack:
             'Mozilla/5.0 (Linux; Android 12; SM-G998B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/111.0.0.0 Mobile Safari/537.36'
         ]
 
-        preload_model(self.whisper_model)
+        if not defer_whisper:
+            preload_model(self.whisper_model)
         self._setup_session()
 
     def _get_whisper(self):
@@ -44,10 +168,12 @@ class FacebookDirectAttack:
         return require_model(self.whisper_model)
     
     def _setup_session(self):
-        ua = random.choice(self.user_agents)
+        # One UA per instance: the session, yt-dlp and direct downloads all
+        # present the same browser.
+        self._ua = random.choice(self.user_agents)
         
         self.session.headers.update({
-            'User-Agent': ua,
+            'User-Agent': self._ua,
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.9,vi;q=0.8',
             'Accept-Encoding': 'gzip, deflate, br',
@@ -55,22 +181,64 @@ class FacebookDirectAttack:
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1'
         })
-    
-    def _extract_video_id(self, url):
-        patterns = [
-            r'/videos/(\d+)',
-            r'v=(\d+)',
-            r'/(\d+)/?$',
-            r'/watch/?\?v=(\d+)',
-            r'/reel/(\d+)'
-        ]
 
-        for pattern in patterns:
-            match = re.search(pattern, url)
+        # Keep-alive pools per host (m./touch./mbasic./graph.facebook.com and
+        # the fbcdn CDNs) wide enough for the concurrent probes, with a quick
+        # retry on transient gateway errors.
+        retry = Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504],
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _extract_video_id(url):
+        for pattern in _VIDEO_ID_PATTERNS:
+            match = pattern.search(url)
             if match:
                 return match.group(1)
         return None
     
+    @staticmethod
+    def _read_page(response, stop=None):
+        """Read an HTML body incrementally, stopping once a player URL shows up.
+
+        The player JSON sits near the top of the mobile pages, so most of a
+        0.5-2 MB body never has to be downloaded, decoded or scanned.  Gives
+        up after _MAX_PAGE_BYTES, or as soon as *stop* (a threading.Event)
+        is set because another probe already won.
+        """
+        decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+        content, received, pos = '', 0, 0
+        try:
+            for chunk in response.iter_content(chunk_size=65536):
+                received += len(chunk)
+                content += decoder.decode(chunk)
+                if any(m.lastgroup in _EARLY_STOP_GROUPS
+                       and _clean_video_url(m.group(m.lastgroup))
+                       for m in _VIDEO_URL_RE.finditer(content, pos)):
+                    break
+                if received >= _MAX_PAGE_BYTES or (stop is not None and stop.is_set()):
+                    break
+                # Re-scan a little overlap in case a match straddles chunks
+                pos = max(0, len(content) - 4096)
+        finally:
+            response.close()
+        return content
+    
+    def _probe(self, url_template, stop=None):
+        """GET one mobile page; return ``(url, html)`` on HTTP 200, else None."""
+        if stop is not None and stop.is_set():
+            return None
+        print(f"🔍 Trying: {url_template}")
+        
+        response = self.session.get(url_template, headers=_MOBILE_EXTRA, timeout=20, stream=True)
+        if response.status_code == 200:
+            return url_template, self._read_page(response, stop)
+        response.close()
+        return None
+    
     def method_mobile_webapp_extraction(self, video_id):
         """Advanced mobile webapp extraction"""
         try:
@@ -81,55 +249,36 @@ class FacebookDirectAttack:
                 f"https://mbasic.facebook.com/watch/?v={video_id}"
             ]
             
-            for url_template in mobile_urls:
-                try:
-                    print(f"🔍 Trying: {url_template}")
-                    
-                    headers = self.session.headers.copy()
-                    headers.update({
-                        'Referer': 'https://www.google.com/',
-                        'Origin': 'https://m.facebook.com'
-                    })
-                    
-                    response = self.session.get(url_template, headers=headers, timeout=20)
-                    
-                    if response.status_code == 200:
-                        content = response.text
-                        
-                        # Video URL patterns (fixed)
-                        video_patterns = [
-                            r'"playable_url":"([^"]+)"',
-                            r'"src":"([^"]+\.mp4[^"]*)',
-                            r'"hd_src":"([^"]+)"',
-                            r'"sd_src":"([^"]+)"',
-                            r'"url":"([^"]*scontent[^"]*\.mp4[^"]*)',
-                            r'"url":"([^"]*fbcdn[^"]*\.mp4[^"]*)',
-                            r'"contentUrl":"([^"]+\.mp4[^"]*)',
-                            r'"videoData":{[^}]*"url":"([^"]+)"',
-                            r'"video_url":"([^"]+)"'
-                        ]
+            # Fetch all four at once so one stalled host can't hold up the
+            # rest; pages are parsed as they arrive.
+            pool = ThreadPoolExecutor(max_workers=4)
+            stop = threading.Event()
+            futures = {pool.submit(self._probe, u, stop): u for u in mobile_urls}
+            try:
+                for future in as_completed(futures):
+                    url_template = futures[future]
+                    try:
+                        probed = future.result()
+                        if probed is None:
+                            continue
+                        url_used, content = probed
                         
+                        # Structured JSON first, then the regex sweep for
+                        # URLs that only appear in inline script strings
                         found_urls = []
-                        for pattern in video_patterns:
-                            matches = re.findall(pattern, content, re.IGNORECASE)
+                        for matches in [_json_video_urls(content),
+                                        *scan(_VIDEO_URL_RE, content).values()]:
                             for match in matches:
-                                clean_url = match.replace('\\/', '/').replace('\\u0026', '&')
-                                if 'http' in clean_url and ('.mp4' in clean_url or 'video' in clean_url):
+                                clean_url = _clean_video_url(match)
+                                if clean_url:
                                     found_urls.append(clean_url)
                         
                         # Title extraction
                         title = "Facebook Video"
-                        title_patterns = [
-                            r'<title[^>]*>([^<]+)</title>',
-                            r'property="og:title"[^>]*content="([^"]+)"',
-                            r'"title":"([^"]+)"'
-                        ]
-                        
-                        for pattern in title_patterns:
-                            match = re.search(pattern, content, re.IGNORECASE)
-                            if match:
-                                potential_title = match.group(1).strip()
-                                if potential_title and len(potential_title) > 5:
+                        for matches in scan(_TITLE_RE, content).values():
+                            if matches:
+                                potential_title = matches[0].strip()
+                                if len(potential_title) > 5:
                                     title = potential_title[:200]
                                     break
                         
@@ -140,12 +289,17 @@ class FacebookDirectAttack:
                                 'method': 'mobile-webapp-enhanced',
                                 'title': title,
                                 'video_urls': found_urls,
-                                'url_used': url_template
+                                'url_used': url_used
                             }
                             
-                except Exception as e:
-                    print(f"❌ Mobile URL {url_template} failed: {e}")
-                    continue
+                    except Exception as e:
+                        print(f"❌ Mobile URL {url_template} failed: {e}")
+                        continue
+            finally:
+                # First page with video URLs wins; drop the rest and stop
+                # the probes still streaming their pages
+                stop.set()
+                pool.shutdown(wait=False, cancel_futures=True)
                     
         except Exception as e:
             print(f"Mobile webapp extraction failed: {e}")
@@ -191,44 +345,34 @@ class FacebookDirectAttack:
                 f"https://scontent-hkg3-1.xx.fbcdn.net/v/t42.9040-2/{video_id}_n.mp4"
             ]
             
-            for cdn_url in cdn_patterns:
-                try:
-                    response = self.session.head(cdn_url, timeout=10)
-                    if response.status_code == 200:
-                        content_type = response.headers.get('content-type', '')
-                        if 'video' in content_type:
-                            return {
-                                'success': True,
-                                'method': 'cdn-bruteforce',
-                                'video_url': cdn_url
-                            }
-                            
-                except Exception:
-                    continue
+            # Unrelated CDN hosts (own DNS + TLS each) — HEAD them all at once
+            pool = ThreadPoolExecutor(max_workers=len(cdn_patterns))
+            futures = {pool.submit(self.session.head, cdn_url, timeout=10): cdn_url
+                       for cdn_url in cdn_patterns}
+            try:
+                for future in as_completed(futures):
+                    cdn_url = futures[future]
+                    try:
+                        response = future.result()
+                        if response.status_code == 200:
+                            content_type = response.headers.get('content-type', '')
+                            if 'video' in content_type:
+                                return {
+                                    'success': True,
+                                    'method': 'cdn-bruteforce',
+                                    'video_url': cdn_url
+                                }
+                                
+                    except Exception:
+                        continue
+            finally:
+                pool.shutdown(wait=False, cancel_futures=True)
                     
         except Exception as e:
             print(f"CDN brute force failed: {e}")
         
         return {'success': False}
     
-    @staticmethod
-    def _parse_vtt(raw):
-        """Convert VTT/SRT subtitle content to clean plain text."""
-        lines, seen = [], set()
-        for line in raw.splitlines():
-            line = line.strip()
-            if not line or line.startswith(('WEBVTT', 'Kind:', 'Language:', 'NOTE', 'STYLE')):
-                continue
-            if '-->' in line or line.isdigit():
-                continue
-            clean = re.sub(r'<[^>]+>', '', line).strip()
-            if clean and clean not in seen:
-                lines.append(clean)
-                seen.add(clean)
-            if len(seen) > 200:
-                seen.clear()
-        return '\n'.join(lines)
-
     def _check_subtitles(self, url):
         """Try fetching existing subtitles via yt-dlp before heavier methods."""
         try:
@@ -241,22 +385,23 @@ class FacebookDirectAttack:
                 '-o', '%(id)s.%(ext)s',
                 url
             ]
-            subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            for f in os.listdir(self.temp_dir):
-                if f.endswith(('.vtt', '.srt', '.ass')):
-                    sub_path = os.path.join(self.temp_dir, f)
-                    with open(sub_path, 'r', encoding='utf-8') as fh:
-                        raw = fh.read()
-                    os.remove(sub_path)
-                    content = self._parse_vtt(raw)
-                    if len(content.strip()) > 20:
-                        return {
-                            'success': True,
-                            'title': 'Facebook Video',
-                            'transcript': content,
-                            'source': 'facebook_yt-dlp_subs',
-                            'language': 'auto'
-                        }
+            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=30)
+            with os.scandir(self.temp_dir) as entries:
+                sub_paths = [e.path for e in entries
+                             if e.name.endswith(_SUBTITLE_EXTS) and e.is_file()]
+            for sub_path in sub_paths:
+                with open(sub_path, 'r', encoding='utf-8') as fh:
+                    raw = fh.read()
+                os.remove(sub_path)
+                content = parse_vtt(raw)
+                if len(content.strip()) > 20:
+                    return {
+                        'success': True,
+                        'title': 'Facebook Video',
+                        'transcript': content,
+                        'source': 'facebook_yt-dlp_subs',
+                        'language': 'auto'
+                    }
         except Exception:
             pass
         return None
@@ -272,7 +417,7 @@ class FacebookDirectAttack:
                 '--output', audio_file.replace('.wav', '.%(ext)s'),
                 url
             ]
-            r = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+            r = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=120)
             if r.returncode == 0:
                 # Find audio file
                 for ext in ['wav', 'mp3', 'm4a', 'webm']:
@@ -306,12 +451,15 @@ class FacebookDirectAttack:
         """Resolve Facebook /share/v/ URLs to actual video URL via yt-dlp."""
         if '/share/' not in url:
             return url
+        if url in self._resolved_cache:
+            return self._resolved_cache[url]
         try:
             cmd = ['yt-dlp', '--print', 'webpage_url', '--no-download', url]
             r = subprocess.run(cmd, capture_output=True, text=True, timeout=20)
             if r.returncode == 0 and r.stdout.strip():
                 resolved = r.stdout.strip()
                 print(f"📎 Resolved share URL: {resolved}")
+                self._resolved_cache[url] = resolved
                 return resolved
         except Exception:
             pass
@@ -319,16 +467,22 @@ class FacebookDirectAttack:
 
     def extract_facebook_direct(self, url):
         """Main extraction method"""
-        # Resolve /share/v/ URLs first
-        url = self._resolve_share_url(url)
-        print(f"🚀 Facebook Direct Attack: {url}")
-
         # --- Subtitle-first: fast path ---
-        sub_result = self._check_subtitles(url)
+        # The subtitle probe runs on the URL as given (yt-dlp follows share
+        # links itself), alongside the /share/v/ resolution.
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            sub_future = pool.submit(self._check_subtitles, url)
+            url = self._resolve_share_url(url)
+            print(f"🚀 Facebook Direct Attack: {url}")
+            sub_result = sub_future.result()
         if sub_result:
             print("✅ Subtitles found — skipping heavy extraction")
             return sub_result
 
+        if self.defer_whisper:
+            # Warm up in the background while the download attacks run
+            preload_model(self.whisper_model)
+
         # --- yt-dlp audio extraction (most reliable for Facebook) ---
         print("🎵 Trying yt-dlp audio extraction...")
         ytdlp_result = self._ytdlp_extract(url)
@@ -343,27 +497,53 @@ class FacebookDirectAttack:
 
         # Try all attack methods
         methods = [
-            lambda: self.method_mobile_webapp_extraction(video_id),
-            lambda: self.method_graph_api_attack(video_id),
-            lambda: self.method_cdn_bruteforce(video_id)
+            self.method_mobile_webapp_extraction,
+            self.method_graph_api_attack,
+            self.method_cdn_bruteforce
         ]
         
         successful_method = None
         
+        # The attacks are independent network probes against different
+        # hosts — launch them together instead of sitting through each one's
+        # timeouts in turn.  Priority is kept: a result is taken only once
+        # every higher-priority attack has finished without a usable one.
+        pool = ThreadPoolExecutor(max_workers=len(methods))
+        futures = {}
         for i, method in enumerate(methods, 1):
-            method_name = method.__code__.co_name.replace('method_', '')
+            method_name = method.__name__.replace('method_', '')
             print(f"\n🔥 Attack {i}: {method_name}")
-            try:
-                result = method()
-                if result['success']:
+            futures[pool.submit(method, video_id)] = i
+        usable = {}  # attack number -> result with video URLs, or None
+        try:
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"💥 Attack {i} error: {e}")
+                    result = {'success': False}
+                if result['success'] and self._video_urls(result):
                     print(f"✅ Attack {i} BREAKTHROUGH!")
-                    successful_method = result
-                    break
+                    usable[i] = result
+                elif result['success']:
+                    print(f"⚠️ Attack {i} returned no video URLs")
+                    usable[i] = None
                 else:
                     print(f"❌ Attack {i} blocked")
-            except Exception as e:
-                print(f"💥 Attack {i} error: {e}")
-                continue
+                    usable[i] = None
+
+                for j in range(1, len(methods) + 1):
+                    if j not in usable:
+                        break  # a higher-priority attack is still running
+                    if usable[j] is not None:
+                        successful_method = usable[j]
+                        break
+                if successful_method:
+                    break
+        finally:
+            # Don't wait for the lower-priority attacks once one has won
+            pool.shutdown(wait=False, cancel_futures=True)
         
         if not successful_method:
             # Last resort: use yt-dlp to download audio + Whisper transcription
@@ -378,7 +558,7 @@ class FacebookDirectAttack:
                     '--output', audio_file.replace('.wav', '.%(ext)s'),
                     url
                 ]
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+                result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=120)
                 if result.returncode == 0:
                     # Find the output file — check expected name, then scan dir
                     found = None
@@ -388,14 +568,15 @@ class FacebookDirectAttack:
                             found = candidate
                             break
                     if not found:
-                        for f in os.listdir(self.temp_dir):
-                            if f.endswith(('.wav', '.mp3', '.m4a', '.webm')):
-                                found = os.path.join(self.temp_dir, f)
-                                break
+                        with os.scandir(self.temp_dir) as entries:
+                            for entry in entries:
+                                if entry.name.endswith(_AUDIO_EXTS) and entry.is_file():
+                                    found = entry.path
+                                    break
                     audio_file = found
                     if audio_file and os.path.exists(audio_file):
                         transcript = self._transcribe_audio(audio_file)
-                        os.remove(audio_file)
+                        discard_audio(audio_file)
                         if transcript and len(transcript.strip()) > 20:
                             print(f"🎉 yt-dlp fallback SUCCESS! {len(transcript)} chars")
                             return {
@@ -411,14 +592,7 @@ class FacebookDirectAttack:
         
         # Process results
         title = successful_method.get('title', 'Facebook Video')
-        video_urls = []
-        
-        if 'video_urls' in successful_method:
-            video_urls = successful_method['video_urls']
-        elif 'video_url' in successful_method:
-            video_urls = [successful_method['video_url']]
-        elif 'data' in successful_method and 'source' in successful_method['data']:
-            video_urls = [successful_method['data']['source']]
+        video_urls = self._video_urls(successful_method)
         
         print(f"📝 Title: {title}")
         print(f"🎬 Video URLs found: {len(video_urls)}")
@@ -432,7 +606,7 @@ class FacebookDirectAttack:
             
             try:
                 audio_file = self._download_and_extract_audio(video_url)
-                if audio_file:
+                if audio_file is not None:
                     transcript = self._transcribe_audio(audio_file)
                     if transcript and len(transcript.strip()) > 20:
                         successful_video_url = video_url
@@ -469,8 +643,22 @@ class FacebookDirectAttack:
         
         return result
     
+    @staticmethod
+    def _video_urls(result):
+        """Video URLs carried by an attack result (empty for title-only hits)."""
+        if result.get('video_urls'):
+            return result['video_urls']
+        if result.get('video_url'):
+            return [result['video_url']]
+        source = (result.get('data') or {}).get('source')
+        return [source] if source else []
+
     def _download_and_extract_audio(self, video_url):
-        """Download and extract audio"""
+        """Download and extract audio.
+
+        Returns an audio file path (yt-dlp) or a 16kHz float32 sample array
+        (direct-download fallback); both are accepted by Whisper.
+        """
         try:
             audio_file = os.path.join(self.temp_dir, f"audio_{int(time.time())}.mp3")
             
@@ -479,14 +667,14 @@ class FacebookDirectAttack:
                 'yt-dlp',
                 '--extract-audio',
                 '--audio-format', 'mp3',
-                '--user-agent', random.choice(self.user_agents),
+                '--user-agent', self._ua,
                 '--add-header', 'Referer: https://m.facebook.com/',
                 '--no-check-certificate',
                 '--output', audio_file.replace('.mp3', '.%(ext)s'),
                 video_url
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=60)
             
             if result.returncode == 0:
                 for ext in ['mp3', 'wav', 'm4a']:
@@ -498,37 +686,53 @@ class FacebookDirectAttack:
             # Direct download attempt
             print("🔄 Trying direct download...")
             
-            headers = {
-                'User-Agent': random.choice(self.user_agents),
-                'Referer': 'https://m.facebook.com/',
-                'Accept': '*/*'
-            }
-            
-            video_file = audio_file.replace('.mp3', '.mp4')
-            
-            response = self.session.get(video_url, headers=headers, stream=True, timeout=30)
-            if response.status_code in [200, 206]:
-                with open(video_file, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                
-                # Extract audio with ffmpeg
-                ffmpeg_cmd = [
-                    'ffmpeg',
-                    '-i', video_file,
-                    '-vn', '-acodec', 'mp3', '-ar', '16000', '-ac', '1', '-y',
-                    audio_file
-                ]
+            with self.session.get(video_url, headers=_DOWNLOAD_EXTRA,
+                                  stream=True, timeout=30) as response:
+                if response.status_code in [200, 206]:
+                    # Pipe the download straight into ffmpeg and read 16kHz mono
+                    # float32 PCM back from its stdout — an array Whisper takes
+                    # as-is, so neither the video nor the audio touches disk.
+                    import numpy as np
+
+                    ffmpeg_cmd = [
+                        'ffmpeg',
+                        '-i', 'pipe:0',
+                        '-vn', '-ar', '16000', '-ac', '1',
+                        '-f', 'f32le', 'pipe:1'
+                    ]
                 
-                ffmpeg_result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True, timeout=30)
+                    proc = subprocess.Popen(ffmpeg_cmd, stdin=subprocess.PIPE,
+                                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+                    response.raw.decode_content = True
+
+                    def _feed():
+                        try:
+                            shutil.copyfileobj(response.raw, proc.stdin, 1024 * 1024)
+                        except Exception:
+                            pass  # ffmpeg gave up or the download broke off; the exit code says which
+                        finally:
+                            try:
+                                proc.stdin.close()
+                            except BrokenPipeError:
+                                pass
+
+                    # Feed on a separate thread: with both pipes open, writing
+                    # and reading from one thread would deadlock once they fill.
+                    feeder = threading.Thread(target=_feed, daemon=True)
+                    feeder.start()
+                    pcm = proc.stdout.read()
+                    feeder.join()
                 
-                if os.path.exists(video_file):
-                    os.remove(video_file)
+                    try:
+                        returncode = proc.wait(timeout=30)
+                    except subprocess.TimeoutExpired:
+                        proc.kill()
+                        raise
                 
-                if ffmpeg_result.returncode == 0 and os.path.exists(audio_file):
-                    print(f"✅ Direct download success: {audio_file}")
-                    return audio_file
+                    if returncode == 0 and pcm:
+                        audio = np.frombuffer(pcm, dtype=np.float32)
+                        print(f"✅ Direct download success: {len(audio) / 16000:.1f}s of audio")
+                        return audio
             
         except Exception as e:
             print(f"❌ Download failed: {e}")
@@ -542,19 +746,16 @@ class FacebookDirectAttack:
             return None
 
         try:
-            print(f"🎤 Transcribing: {audio_file}")
-            result = whisper.transcribe(audio_file, language="vi")
-            transcript = result["text"].strip()
+            print(f"🎤 Transcribing: {audio_file if isinstance(audio_file, str) else 'in-memory audio'}")
+            transcript = transcribe(whisper, audio_file, language="vi", batch_size=16)
             
-            if os.path.exists(audio_file):
-                os.remove(audio_file)
+            discard_audio(audio_file)
             
             return transcript
             
         except Exception as e:
             print(f"❌ Transcription failed: {e}")
-            if os.path.exists(audio_file):
-                os.remove(audio_file)
+            discard_audio(audio_file)
             return None
     
     def cleanup(self):
@@ -572,7 +773,8 @@ def main():
         sys.exit(1)
     
     url = sys.argv[1]
-    extractor = FacebookDirectAttack()
+    # A single run: skip loading Whisper if subtitles are found
+    extractor = FacebookDirectAttack(defer_whisper=True)
     
     try:
         result = extractor.extract_facebook_direct(url)
@@ -0,0 +1,53 @@
+"""
+GPU log-mel feature extraction for faster-whisper.
+
+faster-whisper computes Whisper's log-mel spectrogram with a NumPy STFT on
+the CPU before every encoder pass — for short clips that is a large slice
+of the wall time.  GPUFeatureExtractor is a drop-in replacement that runs
+the STFT and the mel projection on CUDA via torch, with the mel filterbank
+and Hann window uploaded once at construction.
+
+torch is optional: whisper_manager only installs this extractor when torch
+is importable and can see a GPU.
+"""
+
+import numpy as np
+import torch
+from faster_whisper.feature_extractor import FeatureExtractor
+
+
+class GPUFeatureExtractor(FeatureExtractor):
+    def __init__(self, device: str = "cuda", **kwargs):
+        super().__init__(**kwargs)
+        self.device = device
+        # Resident on the device for the lifetime of the model
+        self._mel_filters = torch.from_numpy(self.mel_filters).to(device)
+        self._window = torch.hann_window(self.n_fft, device=device)
+
+    def __call__(self, waveform: np.ndarray, padding=160, chunk_length=None):
+        """Compute the log-Mel spectrogram of *waveform* on the GPU."""
+        # torch's reflect padding needs more samples than the NumPy path;
+        # the odd near-empty VAD chunk goes through the CPU implementation.
+        if waveform.shape[-1] + padding <= self.n_fft:
+            return super().__call__(waveform, padding, chunk_length)
+
+        if chunk_length is not None:
+            self.n_samples = chunk_length * self.sampling_rate
+            self.nb_max_frames = self.n_samples // self.hop_length
+
+        audio = torch.from_numpy(np.ascontiguousarray(waveform, dtype=np.float32))
+        audio = audio.to(self.device, non_blocking=True)
+        if padding:
+            audio = torch.nn.functional.pad(audio, (0, padding))
+
+        stft = torch.stft(audio, self.n_fft, self.hop_length,
+                          window=self._window, return_complex=True)
+        magnitudes = stft[..., :-1].abs() ** 2
+
+        mel_spec = self._mel_filters @ magnitudes
+
+        log_spec = torch.clamp(mel_spec, min=1e-10).log10()
+        log_spec = torch.maximum(log_spec, log_spec.max() - 8.0)
+        log_spec = (log_spec + 4.0) / 4.0
+
+        return log_spec.cpu().numpy()
@@ -0,0 +1,26 @@
+"""
+Gunicorn settings for the backend service (see wsgi.py).
+
+One worker process holds the Whisper model; requests are served by its
+threads.  Inference releases the GIL inside CTranslate2, and the extraction
+pool in server.py overlaps downloads with it.
+
+The app is deliberately not preloaded in the master: whisper_manager starts
+loading the model on a background thread at import, and neither that thread
+nor a CUDA context survives fork().
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = 1
+worker_class = "gthread"
+# Each open /api/jobs/<id>/stream holds a thread for up to STREAM_TIMEOUT;
+# server.py caps them at MAX_STREAMS (default 4) so the rest stay free for
+# /api/transcribe and /api/health.  Raise both together.
+threads = int(os.environ.get("GUNICORN_THREADS", "16"))
+preload_app = False
+
+# Synchronous /api/transcribe calls last as long as the transcription
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "900"))
+graceful_timeout = 30
@@ -9,20 +9,41 @@ via whisper_manager.
 Usage:
     python3 server.py                          # defaults
     WHISPER_MODEL=large-v3 PORT=8080 python3 server.py
+    gunicorn -c gunicorn.conf.py wsgi:app      # threaded, for production
 """
 
 import os
 import time
-import uuid
+import secrets
 import threading
 import logging
-from urllib.parse import urlparse
-
-from flask import Flask, request, jsonify
+import heapq
+import statistics
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from cachetools import Cache, TLRUCache, TTLCache
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 
-from whisper_manager import preload_model
-from transcript_extractor import WhisperTranscriptExtractor
+try:
+    import psutil
+except ImportError:  # memory pressure then never shortens cache TTLs
+    psutil = None
+
+try:
+    import diskcache
+except ImportError:  # CACHE_DIR is then ignored
+    diskcache = None
+
+try:
+    import orjson
+except ImportError:  # Flask's stdlib-json provider is used instead
+    orjson = None
+
+from whisper_manager import preload_model, device_info
+from transcript_extractor import WhisperTranscriptExtractor, _parse_url
 from facebook_direct_fixed import FacebookDirectAttack
 from douyin_breakthrough import DouyinBreakthrough
 
@@ -30,8 +51,23 @@ from douyin_breakthrough import DouyinBreakthrough
 # Configuration (env vars)
 # ---------------------------------------------------------------------------
 WHISPER_MODEL = os.environ.get("WHISPER_MODEL", "small")
+# Per-language checkpoints, e.g. "en=distil-small.en,vi=large-v3"
+WHISPER_LANGUAGE_MODELS = dict(
+    item.split("=", 1)
+    for item in os.environ.get("WHISPER_LANGUAGE_MODELS", "").split(",")
+    if "=" in item
+)
 PORT = int(os.environ.get("PORT", "5000"))
 CACHE_TTL = int(os.environ.get("CACHE_TTL", "3600"))
+CACHE_MAX = int(os.environ.get("CACHE_MAX", "1024"))
+EXTRACT_WORKERS = int(os.environ.get("EXTRACT_WORKERS", "4"))
+MAX_JOBS = int(os.environ.get("MAX_JOBS", "4"))
+STREAM_TIMEOUT = int(os.environ.get("STREAM_TIMEOUT", "300"))
+# Open SSE streams allowed at once; each holds a server thread (see
+# gunicorn.conf.py), so keep this below the thread count
+MAX_STREAMS = int(os.environ.get("MAX_STREAMS", "4"))
+CACHE_DIR = os.environ.get("CACHE_DIR")  # enables the on-disk L2 cache
+CACHE_DISK_LIMIT = int(os.environ.get("CACHE_DISK_LIMIT", str(2**30)))  # bytes
 
 # ---------------------------------------------------------------------------
 # Logging
@@ -45,7 +81,19 @@ logger = logging.getLogger("server")
 # ---------------------------------------------------------------------------
 # App + CORS
 # ---------------------------------------------------------------------------
+class _OrjsonProvider(DefaultJSONProvider):
+    """Serialize responses (multi-KB transcripts) with orjson."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=self.default).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+if orjson is not None:
+    app.json = _OrjsonProvider(app)
 CORS(app)
 
 # ---------------------------------------------------------------------------
@@ -56,100 +104,326 @@ preload_model(WHISPER_MODEL)
 
 _startup_time = time.time()
 
-extractor_yt = WhisperTranscriptExtractor(whisper_model=WHISPER_MODEL)
+extractor_yt = WhisperTranscriptExtractor(whisper_model=WHISPER_MODEL,
+                                          language_models=WHISPER_LANGUAGE_MODELS)
 extractor_fb = FacebookDirectAttack(whisper_model=WHISPER_MODEL)
-extractor_dy = DouyinBreakthrough(whisper_model=WHISPER_MODEL)
 
 # ---------------------------------------------------------------------------
-# Transcription lock — serializes extraction (temp-dir collisions, CPU-bound)
+# Extraction pool — downloads, yt-dlp and ffmpeg for different requests run
+# side by side; whisper_manager serializes the Whisper inference itself.
+# Extractors keep state in their temp dir, so each worker gets its own set.
 # ---------------------------------------------------------------------------
-_transcription_lock = threading.Lock()
+_extract_pool = ThreadPoolExecutor(max_workers=EXTRACT_WORKERS,
+                                   thread_name_prefix="vtt-extract")
+_worker = threading.local()
+
+
+def _worker_extractors() -> tuple[WhisperTranscriptExtractor, DouyinBreakthrough]:
+    """Return the calling worker thread's (youtube/tiktok/facebook, douyin) extractors."""
+    extractors = getattr(_worker, "extractors", None)
+    if extractors is None:
+        extractors = _worker.extractors = (
+            WhisperTranscriptExtractor(whisper_model=WHISPER_MODEL,
+                                       language_models=WHISPER_LANGUAGE_MODELS),
+            DouyinBreakthrough(whisper_model=WHISPER_MODEL),
+        )
+    return extractors
+
 
 # ---------------------------------------------------------------------------
-# In-memory cache  {normalized_url: (timestamp, response_dict)}
+# In-memory cache  {normalized_url: _CacheEntry}
+# Per-entry TTL, bounded (CACHE_MAX entries in total), split into shards, each
+# with its own lock, so lookups for different URLs don't contend on one mutex.
 # ---------------------------------------------------------------------------
-_cache: dict[str, tuple[float, dict]] = {}
-_cache_lock = threading.Lock()
+# Each second of a platform's p95 processing time buys this many seconds of
+# retention, clamped to [CACHE_TTL / 4, CACHE_TTL * 4].
+_TTL_PER_SECOND = 60
+_platform_latency: dict[str, deque] = {
+    p: deque(maxlen=256) for p in ("youtube", "tiktok", "facebook", "douyin")
+}
+_memory_sampled_at = 0.0
+_memory_pressure_level = 0.0
+
+
+def _memory_pressure() -> float:
+    """0 below 70% RAM use, rising linearly to 1 at 90%; sampled every 5 s."""
+    global _memory_sampled_at, _memory_pressure_level
+    now = time.monotonic()
+    if psutil is not None and now - _memory_sampled_at >= 5:
+        used = psutil.virtual_memory().percent / 100
+        _memory_pressure_level = min(1.0, max(0.0, (used - 0.7) / (0.9 - 0.7)))
+        _memory_sampled_at = now
+    return _memory_pressure_level
+
+
+def _entry_ttl(platform: str) -> float:
+    """Seconds to keep a *platform* result: longer the costlier it is to redo."""
+    samples = list(_platform_latency.get(platform, ()))
+    if len(samples) > 1:
+        ttl = statistics.quantiles(samples, n=20)[-1] * _TTL_PER_SECOND
+    elif samples:
+        ttl = samples[0] * _TTL_PER_SECOND
+    else:
+        ttl = CACHE_TTL
+    ttl = min(max(ttl, CACHE_TTL / 4), CACHE_TTL * 4)
+    return ttl * (1 - _memory_pressure())
+
+
+class _CacheEntry:
+    """A cached response plus the stats value-aware eviction needs."""
+
+    __slots__ = ("data", "ttl", "hits", "last_hit", "worth")
+
+    def __init__(self, data: dict, ttl: float):
+        self.data = data
+        self.ttl = ttl
+        self.hits = 0
+        self.last_hit = time.monotonic()
+        # Transcript bytes per second of recompute: what one hit saves
+        self.worth = (len(data.get("transcript", ""))
+                      / max(0.1, data.get("processing_time_seconds", 0)))
+
+    @property
+    def value(self) -> float:
+        return max(1, self.hits) * self.worth
+
+
+class _ValueCache(TLRUCache):
+    """TLRUCache that admits and evicts by caching value instead of recency alone.
+
+    Once full, a new entry is only admitted if its value beats the median of
+    the last 100 offered, and the entry evicted is the least valuable (value
+    plus hits) of the least recently hit tenth.  Entries expire after their
+    own ``ttl``.  Not thread-safe on its own; callers hold the shard lock.
+    """
+
+    def __init__(self, maxsize: int, timer=time.monotonic):
+        super().__init__(maxsize, ttu=lambda _key, entry, now: now + entry.ttl,
+                         timer=timer)
+        self._offered = deque(maxlen=100)
+
+    def admit(self, key: str, entry: _CacheEntry) -> bool:
+        """Record *entry*'s value; return whether it may be inserted."""
+        self.expire()  # expired entries don't count towards being full
+        threshold = statistics.median(self._offered) if self._offered else 0.0
+        self._offered.append(entry.value)
+        full = self.currsize >= self.maxsize and key not in self
+        return not full or entry.value > threshold
+
+    def popitem(self):
+        self.expire()
+        if not self:
+            raise KeyError(f"{type(self).__name__} is empty")
+        entries = [(key, Cache.__getitem__(self, key)) for key in self]
+        coldest = heapq.nsmallest(max(1, len(entries) // 10), entries,
+                                  key=lambda item: item[1].last_hit)
+        key = min(coldest, key=lambda item: item[1].value + item[1].hits)[0]
+        return key, self.pop(key)
+
+
+_CACHE_SHARDS = 16  # power of two, see _shard()
+_cache_shards: list[_ValueCache] = [
+    _ValueCache(maxsize=max(1, CACHE_MAX // _CACHE_SHARDS))
+    for _ in range(_CACHE_SHARDS)
+]
+_cache_shard_locks = [threading.Lock() for _ in range(_CACHE_SHARDS)]
 
 
 def _normalize_url(url: str) -> str:
     """Strip trailing slashes and fragments for cache key."""
-    parsed = urlparse(url)
-    return parsed._replace(fragment="").geturl().rstrip("/")
-
+    return url.split("#", 1)[0].rstrip("/")
+
+
+def _shard(key: str) -> tuple[_ValueCache, threading.Lock]:
+    """Return the ``(shard, lock)`` pair owning *key*."""
+    h = hash(key) & (_CACHE_SHARDS - 1)
+    return _cache_shards[h], _cache_shard_locks[h]
+
+
+def _cache_size() -> int:
+    total = 0
+    for shard, lock in zip(_cache_shards, _cache_shard_locks):
+        with lock:
+            shard.expire()  # drop entries past their TTL before counting
+            total += len(shard)
+    return total
+
+
+# Optional on-disk L2 behind the shards, so a restart doesn't throw away
+# every transcript.  diskcache is SQLite-backed and thread-safe on its own.
+_l2 = None
+if CACHE_DIR:
+    if diskcache is None:
+        logger.warning("CACHE_DIR is set but diskcache is not installed; "
+                       "results are cached in memory only")
+    else:
+        _l2 = diskcache.Cache(CACHE_DIR, size_limit=CACHE_DISK_LIMIT)
+# As long as the longest in-memory TTL (see _entry_ttl)
+_L2_TTL = CACHE_TTL * 4
+
+
+def _cache_get(key: str) -> dict | None:
+    """Look up *key* (see _cache_key) in memory, then in the L2."""
+    cache, lock = _shard(key)
+    with lock:
+        entry = cache.get(key)
+        if entry is not None:
+            entry.hits += 1
+            entry.last_hit = time.monotonic()
+            return entry.data
+    if _l2 is None:
+        return None
+    data = _l2.get(key)
+    if data is not None:
+        _cache_store(key, data)  # promote to memory
+    return data
+
+
+def _cache_put(key: str, data: dict) -> None:
+    _cache_store(key, data)
+    if _l2 is not None:
+        _l2.set(key, data, expire=_L2_TTL)
+
+
+def _cache_store(key: str, data: dict) -> None:
+    cache, lock = _shard(key)
+    entry = _CacheEntry(data, _entry_ttl(data.get("platform", "")))
+    with lock:
+        if cache.admit(key, entry):
+            cache[key] = entry
 
-def _cache_get(url: str) -> dict | None:
-    key = _normalize_url(url)
-    with _cache_lock:
-        entry = _cache.get(key)
-        if entry is None:
-            return None
-        ts, data = entry
-        if time.time() - ts > CACHE_TTL:
-            del _cache[key]
-            return None
-        return data
-
-
-def _cache_put(url: str, data: dict) -> None:
-    key = _normalize_url(url)
-    with _cache_lock:
-        _cache[key] = (time.time(), data)
 
+# ---------------------------------------------------------------------------
+# In-flight extractions  {normalized_url: Future resolving to response_dict}
+# Concurrent requests for the same URL wait on the first one's result.
+# ---------------------------------------------------------------------------
+_inflight: dict[str, Future] = {}
+_inflight_lock = threading.Lock()
 
 # ---------------------------------------------------------------------------
-# Async jobs  {job_id: {"status", "result", "created_at"}}
+# Async jobs  {job_id: {"future", "created_at"}}, forgotten an hour after
+# submission.  Run on their own pool: a job waits on _extract_pool, so
+# sharing it could leave every extraction worker blocked on a queued one.
 # ---------------------------------------------------------------------------
-_jobs: dict[str, dict] = {}
-_jobs_lock = threading.Lock()
+_jobs: TTLCache = TTLCache(maxsize=10_000, ttl=3600)
+_jobs_lock = threading.Lock()  # TTLCache reorders itself on every get
+_job_executor = ThreadPoolExecutor(max_workers=MAX_JOBS, thread_name_prefix="vtt-job")
+
+# Running job count, kept up to date by the jobs themselves so /api/health
+# doesn't have to scan _jobs.
+_active_jobs = 0
+_active_jobs_lock = threading.Lock()
+
+
+def _job_finished(_future: Future) -> None:
+    global _active_jobs
+    with _active_jobs_lock:
+        _active_jobs -= 1
+
+
+# A stream holds its server thread until the job ends or STREAM_TIMEOUT; past
+# MAX_STREAMS, clients get a 503 and fall back to polling /api/jobs/<id>.
+_stream_slots = threading.BoundedSemaphore(MAX_STREAMS)
 
 # ---------------------------------------------------------------------------
 # Core transcription logic
 # ---------------------------------------------------------------------------
 
 
+# Short link -> expanded URL.  Short links rarely change target, but can be
+# recycled, so entries still expire after a day.
+_expanded: TTLCache = TTLCache(maxsize=4096, ttl=86400)
+_expanded_lock = threading.Lock()
+
+
+def _expand_url(url: str) -> str:
+    """extractor_yt.expand_shortened_url, remembering successful expansions."""
+    key = _normalize_url(url)
+    with _expanded_lock:
+        expanded = _expanded.get(key)
+    if expanded is not None:
+        return expanded
+    expanded = extractor_yt.expand_shortened_url(url)
+    if expanded != url:  # unchanged: not a short link, or expansion failed
+        with _expanded_lock:
+            _expanded[key] = expanded
+    return expanded
+
+
 def _identify_platform(url: str) -> str:
-    """Determine platform from URL (mirrors extractor_yt.identify_platform)."""
-    return extractor_yt.identify_platform(url)
+    """Platform for *url*, from the extractor's URL table."""
+    return _parse_url(url)[0]
+
+
+def _cache_key(url: str) -> str:
+    """``platform:video_id`` for *url*, or the normalized URL if no ID is found.
+
+    Share-link variants (youtu.be/ID, watch?v=ID&t=30, m./web.facebook.com,
+    ...) land on one cache entry.
+    """
+    platform, video_id = _parse_url(url)
+    return f"{platform}:{video_id}" if video_id else _normalize_url(url)
 
 
 def _do_transcribe(url: str, language: str | None = None) -> dict:
     """Run transcription; returns a response dict.  Caller must hold no locks."""
     # Expand shortened URLs (vt.tiktok.com, vm.tiktok.com, etc.)
-    url = extractor_yt.expand_shortened_url(url)
+    url = _expand_url(url)
 
     # Check cache first
-    cached = _cache_get(url)
+    key = _cache_key(url)
+    cached = _cache_get(key)
     if cached is not None:
         return {**cached, "cached": True}
 
+    # Coalesce with an identical extraction already running; the in-flight
+    # map, not a second cache lookup, is what stops duplicate runs.
+    with _inflight_lock:
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = _inflight[key] = Future()
+    if not owner:
+        return {**future.result(), "cached": True}
+
+    try:
+        response = _extract_pool.submit(_extract, url, key, language).result()
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(response)
+        return response
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+
+
+def _extract(url: str, key: str, language: str | None) -> dict:
+    """Run the platform extractor for *url* (on an _extract_pool worker)."""
     platform = _identify_platform(url)
+    extractor, extractor_douyin = _worker_extractors()
 
     start = time.time()
-    with _transcription_lock:
-        # Double-check cache after acquiring lock (another thread may have
-        # populated it while we waited).
-        cached = _cache_get(url)
-        if cached is not None:
-            return {**cached, "cached": True}
-
-        if platform == "youtube":
-            result = extractor_yt.extract_youtube(url)
-        elif platform == "tiktok":
-            result = extractor_yt.extract_tiktok(url)
-        elif platform == "facebook":
-            result = extractor_yt.extract_facebook(url)
-        elif platform == "douyin":
-            result = extractor_dy.extract_douyin_breakthrough(url)
-        else:
-            return {
-                "success": False,
-                "error": f"Unsupported platform: {platform}",
-                "cached": False,
-                "processing_time_seconds": round(time.time() - start, 2),
-            }
+    if platform == "youtube":
+        result = extractor.extract_youtube(url)
+    elif platform == "tiktok":
+        result = extractor.extract_tiktok(url)
+    elif platform == "facebook":
+        result = extractor.extract_facebook(url)
+    elif platform == "douyin":
+        result = extractor_douyin.extract_douyin_breakthrough(url)
+    else:
+        return {
+            "success": False,
+            "error": f"Unsupported platform: {platform}",
+            "cached": False,
+            "processing_time_seconds": round(time.time() - start, 2),
+        }
 
     elapsed = round(time.time() - start, 2)
+    if "error" not in result:
+        _platform_latency[platform].append(elapsed)
 
     if "error" in result:
         return {
@@ -171,10 +445,27 @@ def _do_transcribe(url: str, language: str | None = None) -> dict:
         "processing_time_seconds": elapsed,
     }
 
-    _cache_put(url, response)
+    _cache_put(key, response)
     return response
 
 
+# ---------------------------------------------------------------------------
+# Janitor — the caches only purge expired entries when written to, so
+# entries for URLs never requested again would sit there until then.
+# ---------------------------------------------------------------------------
+def _janitor() -> None:
+    caches = [*zip(_cache_shards, _cache_shard_locks),
+              (_jobs, _jobs_lock), (_expanded, _expanded_lock)]
+    while True:
+        time.sleep(max(1.0, CACHE_TTL / 10))
+        for cache, lock in caches:
+            with lock:
+                cache.expire()
+
+
+threading.Thread(target=_janitor, name="cache-janitor", daemon=True).start()
+
+
 # ---------------------------------------------------------------------------
 # Endpoints
 # ---------------------------------------------------------------------------
@@ -182,16 +473,16 @@ def _do_transcribe(url: str, language: str | None = None) -> dict:
 
 @app.route("/api/health", methods=["GET"])
 def health():
-    with _cache_lock:
-        cache_size = len(_cache)
-    with _jobs_lock:
-        active = sum(1 for j in _jobs.values() if j["status"] == "processing")
+    cache_size = _cache_size()
+    device, compute_type = device_info()
     return jsonify({
         "status": "ok",
         "model": WHISPER_MODEL,
+        "device": device,
+        "compute_type": compute_type,
         "uptime_seconds": round(time.time() - _startup_time, 1),
         "cache_size": cache_size,
-        "active_jobs": active,
+        "active_jobs": _active_jobs,
     })
 
 
@@ -216,24 +507,19 @@ def transcribe_async():
         return jsonify({"success": False, "error": "Missing 'url' field"}), 400
 
     language = body.get("language")
-    job_id = uuid.uuid4().hex[:12]
+    job_id = secrets.token_urlsafe(9)  # 12 chars, 72 random bits
 
+    global _active_jobs
+    with _active_jobs_lock:
+        _active_jobs += 1
+    future = _job_executor.submit(_do_transcribe, url, language)
+    future.add_done_callback(_job_finished)
     with _jobs_lock:
         _jobs[job_id] = {
-            "status": "processing",
-            "result": None,
+            "future": future,
             "created_at": time.time(),
         }
 
-    def _run():
-        result = _do_transcribe(url, language)
-        with _jobs_lock:
-            _jobs[job_id]["status"] = "completed"
-            _jobs[job_id]["result"] = result
-
-    t = threading.Thread(target=_run, daemon=True)
-    t.start()
-
     return jsonify({"job_id": job_id, "status": "processing"}), 202
 
 
@@ -243,9 +529,58 @@ def get_job(job_id: str):
         job = _jobs.get(job_id)
     if job is None:
         return jsonify({"error": "Job not found"}), 404
-    if job["status"] == "processing":
+    future = job["future"]
+    if not future.done():
         return jsonify({"job_id": job_id, "status": "processing"}), 200
-    return jsonify({"job_id": job_id, "status": "completed", **job["result"]}), 200
+    return jsonify({"job_id": job_id, "status": "completed", **_job_result(future)}), 200
+
+
+@app.route("/api/jobs/<job_id>/stream", methods=["GET"])
+def stream_job(job_id: str):
+    """Server-Sent Events: one ``data:`` event once the job finishes.
+
+    Replaces polling /api/jobs/<job_id>; comment lines keep proxies from
+    closing the idle connection.  Gives up (status "processing") after
+    STREAM_TIMEOUT seconds.  503 once MAX_STREAMS streams are open.
+    """
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    future = job["future"]
+    slots = _stream_slots
+    if not slots.acquire(blocking=False):
+        return (jsonify({"error": "Too many open streams; poll /api/jobs/<job_id>"}),
+                503, {"Retry-After": "5"})
+
+    def _events():
+        deadline = time.monotonic() + STREAM_TIMEOUT
+        while not future.done():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if not wait([future], timeout=min(15, remaining)).done:
+                yield ": keep-alive\n\n"
+        if future.done():
+            payload = {"job_id": job_id, "status": "completed", **_job_result(future)}
+        else:
+            payload = {"job_id": job_id, "status": "processing"}
+        yield f"data: {app.json.dumps(payload)}\n\n"
+
+    response = Response(_events(), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    # Runs when the server closes the response, even if the client left
+    # before the first event
+    response.call_on_close(slots.release)
+    return response
+
+
+def _job_result(future: Future) -> dict:
+    """Response dict of a finished job; an exception becomes an error result."""
+    error = future.exception()
+    if error is not None:
+        return {"success": False, "error": str(error), "cached": False}
+    return future.result()
 
 
 # ---------------------------------------------------------------------------
@@ -254,4 +589,7 @@ def get_job(job_id: str):
 if __name__ == "__main__":
     logger.info("Starting server on port %d (model=%s, cache_ttl=%ds)",
                 PORT, WHISPER_MODEL, CACHE_TTL)
-    app.run(host="0.0.0.0", port=PORT, debug=False)
+    try:
+        app.run(host="0.0.0.0", port=PORT, debug=False)
+    finally:
+        _job_executor.shutdown(wait=False, cancel_futures=True)
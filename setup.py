@@ -23,7 +23,7 @@ setup(
     packages=find_packages(),
     python_requires=">=3.8",
     install_requires=[
-        "whisper @ git+https://github.com/openai/whisper.git",
+        "faster-whisper>=1.1.0,<1.2",
         "yt-dlp>=2023.12.30", 
         "requests>=2.31.0",
         "beautifulsoup4>=4.12.0",
@@ -0,0 +1,20 @@
+import pytest
+
+pytest.importorskip("requests")
+
+from douyin_breakthrough import _page_title
+
+
+def test_page_title_keeps_aweme_detail_desc():
+    content = ('{"aweme_detail":{"aweme_id":"1","desc":"The real video desc"}, '
+               '"related":[{"desc":"Unrelated other video"}]}')
+    assert _page_title(content) == "The real video desc"
+
+
+def test_page_title_falls_back_to_title_tag():
+    content = '<html><title>Some Douyin title</title>{"desc":"abc"}</html>'
+    assert _page_title(content) == "Some Douyin title"
+
+
+def test_page_title_default():
+    assert _page_title("<html></html>") == "Douyin Video"
@@ -0,0 +1,33 @@
+import re
+
+from extract_utils import discard_audio, parse_vtt, scan
+
+
+def test_parse_vtt_drops_headers_timestamps_and_repeats():
+    raw = (
+        "WEBVTT\nKind: captions\nLanguage: vi\n\n"
+        "1\n00:00:00.000 --> 00:00:01.000\n<c>Xin chào</c>\n\n"
+        "2\n00:00:01.000 --> 00:00:02.000\nXin chào\nmọi người\n"
+    )
+    assert parse_vtt(raw) == "Xin chào\nmọi người"
+
+
+def test_parse_vtt_srt():
+    raw = "1\r\n00:00:00,000 --> 00:00:01,000\r\nHello there\r\n\r\n"
+    assert parse_vtt(raw) == "Hello there"
+
+
+def test_scan_buckets_matches_in_group_order():
+    pattern = re.compile(r'"b":"(?P<b>[^"]+)"|"a":"(?P<a>[^"]+)"')
+    found = scan(pattern, '{"a":"1","b":"2","a":"3"}')
+    assert list(found) == ["b", "a"]
+    assert found == {"b": ["2"], "a": ["1", "3"]}
+
+
+def test_discard_audio_ignores_missing_files_and_arrays(tmp_path):
+    path = tmp_path / "audio.wav"
+    path.write_bytes(b"")
+    discard_audio(str(path))
+    assert not path.exists()
+    discard_audio(str(path))  # already gone
+    discard_audio([0.0, 0.1])
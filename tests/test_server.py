@@ -0,0 +1,141 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+pytest.importorskip("cachetools")
+pytest.importorskip("requests")
+
+import server
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _entry(value, ttl=1000.0, last_hit=0.0):
+    """A cache entry worth *value* (transcript chars per second of work)."""
+    entry = server._CacheEntry({"transcript": "x" * value,
+                                "processing_time_seconds": 1}, ttl)
+    entry.last_hit = last_hit
+    return entry
+
+
+def _offer(cache, key, entry):
+    admitted = cache.admit(key, entry)
+    if admitted:
+        cache[key] = entry
+    return admitted
+
+
+def test_admit_rejects_below_median_once_full():
+    cache = server._ValueCache(maxsize=2, timer=Clock())
+    assert _offer(cache, "a", _entry(10))
+    assert _offer(cache, "b", _entry(20))
+
+    assert not _offer(cache, "c", _entry(12))  # median of 10, 20 is 15
+    assert _offer(cache, "d", _entry(40))      # median of 10, 20, 12 is 12
+    assert "c" not in cache and "d" in cache
+    # Replacing an entry never needs room
+    assert cache.admit("d", _entry(1))
+
+
+def test_admit_ignores_expired_entries():
+    clock = Clock()
+    cache = server._ValueCache(maxsize=2, timer=clock)
+    assert _offer(cache, "a", _entry(100, ttl=10))
+    assert _offer(cache, "b", _entry(100, ttl=10))
+
+    clock.now = 20
+    assert _offer(cache, "c", _entry(1))
+    assert list(cache) == ["c"]
+
+
+def test_eviction_takes_least_valuable_of_coldest_tenth():
+    cache = server._ValueCache(maxsize=20, timer=Clock())
+    cache["cold-valuable"] = _entry(50, last_hit=0)
+    cache["cold-cheap"] = _entry(10, last_hit=1)
+    for i in range(18):
+        # Cheaper than both, but recently hit
+        cache[f"warm{i}"] = _entry(1, last_hit=100 + i)
+
+    cache["new"] = _entry(30)  # popitem runs inside __setitem__'s timer
+
+    assert len(cache) == 20
+    assert "cold-cheap" not in cache
+    assert "cold-valuable" in cache and "new" in cache
+
+
+def test_eviction_skips_expired_entries_first():
+    clock = Clock()
+    cache = server._ValueCache(maxsize=2, timer=clock)
+    cache["short"] = _entry(100, ttl=5, last_hit=50)
+    cache["long"] = _entry(1, ttl=1000, last_hit=0)
+
+    clock.now = 10
+    cache["new"] = _entry(1)
+
+    assert set(cache) == {"long", "new"}
+
+
+@pytest.mark.parametrize("url, key", [
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", "youtube:dQw4w9WgXcQ"),
+    ("https://youtu.be/dQw4w9WgXcQ", "youtube:dQw4w9WgXcQ"),
+    ("https://youtu.be/dQw4w9WgXcQ?si=abc", "youtube:dQw4w9WgXcQ"),
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=30s", "youtube:dQw4w9WgXcQ"),
+    ("https://m.youtube.com/watch?app=desktop&v=dQw4w9WgXcQ", "youtube:dQw4w9WgXcQ"),
+    ("https://www.youtube.com/shorts/dQw4w9WgXcQ", "youtube:dQw4w9WgXcQ"),
+    ("https://www.youtube.com/embed/dQw4w9WgXcQ", "youtube:dQw4w9WgXcQ"),
+    ("https://www.tiktok.com/@user/video/7234567890123456789?lang=en",
+     "tiktok:7234567890123456789"),
+    ("https://www.facebook.com/watch/?v=1234567890", "facebook:1234567890"),
+    ("https://m.facebook.com/watch/?v=1234567890", "facebook:1234567890"),
+    ("https://web.facebook.com/reel/1234567890", "facebook:1234567890"),
+    ("https://www.facebook.com/somepage/videos/1234567890/", "facebook:1234567890"),
+    ("https://www.facebook.com/somepage/videos/a-title/1234567890", "facebook:1234567890"),
+    ("https://www.douyin.com/video/7123456789012345678", "douyin:7123456789012345678"),
+    ("https://www.douyin.com/discover?modal_id=7123456789012345678",
+     "douyin:7123456789012345678"),
+    ("https://www.iesdouyin.com/share/video/7123456789012345678/", "douyin:7123456789012345678"),
+])
+def test_cache_key_collapses_url_variants(url, key):
+    assert server._cache_key(url) == key
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.youtube.com/channel/UCabcdefghijklmnopqrstuv",
+    "https://www.facebook.com/share/v/abcDEF/#frag",
+])
+def test_cache_key_without_video_id_normalizes_url(url):
+    assert server._cache_key(url) == server._normalize_url(url)
+
+
+def test_stream_job_caps_open_streams(monkeypatch):
+    monkeypatch.setattr(server, "_stream_slots", threading.BoundedSemaphore(1))
+    future = Future()
+    future.set_result({"success": True})
+    with server._jobs_lock:
+        server._jobs["stream-test"] = {"future": future, "created_at": time.time()}
+    client = server.app.test_client()
+    try:
+        first = client.get("/api/jobs/stream-test/stream")
+        assert first.status_code == 200  # holds its slot until closed
+
+        second = client.get("/api/jobs/stream-test/stream")
+        assert second.status_code == 503
+        assert second.headers["Retry-After"] == "5"
+
+        first.close()  # frees the slot
+        third = client.get("/api/jobs/stream-test/stream")
+        assert third.status_code == 200
+        third.close()
+    finally:
+        with server._jobs_lock:
+            server._jobs.pop("stream-test", None)
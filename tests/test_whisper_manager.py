@@ -0,0 +1,85 @@
+from collections import namedtuple
+from concurrent.futures import Future
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import whisper_manager
+
+Segment = namedtuple("Segment", "start text")
+
+
+class FakePipeline:
+    """Stands in for BatchedInferencePipeline: one segment per clip, whose
+    text is the sample value at the clip's start."""
+
+    def __init__(self):
+        self.clips = None
+
+    def transcribe(self, audio, language, beam_size, clip_timestamps, batch_size):
+        self.clips = clip_timestamps
+        segments = [Segment(clip["start"] / 16000, f" {audio[clip['start']]:g}")
+                    for clip in clip_timestamps]
+        return iter(segments), None
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    fake = FakePipeline()
+    monkeypatch.setattr(whisper_manager, "_batched_pipeline", lambda model: fake)
+    return fake
+
+
+def _clip(seconds, *speech):
+    """A clip of *seconds* whose ``(start, end, value)`` spans are speech."""
+    audio = np.zeros(seconds * 16000, dtype=np.float32)
+    for start, end, value in speech:
+        audio[start:end] = value
+    return audio, [{"start": start, "end": end} for start, end, _ in speech]
+
+
+def test_transcribe_together_routes_segments_across_clips(pipeline):
+    prepared = [
+        _clip(3, (0, 16000, 1), (32000, 48000, 2)),
+        _clip(2, (0, 32000, 3)),  # speech starts right on the boundary
+    ]
+    texts = whisper_manager._transcribe_together(None, prepared, "vi", 16)
+
+    assert texts == ["1 2", "3"]
+    # Offset past the first clip, and decoded longest first
+    assert pipeline.clips[0] == {"start": 48000, "end": 80000}
+
+
+def test_transcribe_together_clip_without_speech(pipeline):
+    prepared = [_clip(1, (0, 8000, 4)), _clip(2), _clip(1, (4000, 12000, 5))]
+    texts = whisper_manager._transcribe_together(None, prepared, "vi", 16)
+
+    assert texts == ["4", "", "5"]
+    assert {"start": 52000, "end": 60000} in pipeline.clips
+
+
+def test_transcribe_together_no_speech_at_all(pipeline):
+    texts = whisper_manager._transcribe_together(None, [_clip(1), _clip(2)], "vi", 16)
+
+    assert texts == ["", ""]
+    assert pipeline.clips is None
+
+
+def test_transcribe_group_isolates_a_failing_clip(pipeline, monkeypatch):
+    def prepare(audio):
+        if audio == "broken.wav":
+            raise RuntimeError("cannot decode")
+        return audio
+
+    monkeypatch.setattr(whisper_manager, "_prepare_clip", prepare)
+    items = [(_clip(1, (0, 16000, 6)), 16, Future()),
+             ("broken.wav", 16, Future()),
+             (_clip(1, (0, 16000, 7)), 8, Future())]
+    whisper_manager._transcribe_group(None, "vi", items)
+
+    good, bad, other = (future for _, _, future in items)
+    assert good.result(timeout=0) == "6"
+    assert other.result(timeout=0) == "7"
+    with pytest.raises(RuntimeError, match="cannot decode"):
+        bad.result(timeout=0)
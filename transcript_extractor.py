@@ -17,21 +17,101 @@ import time
 import os
 import tempfile
 import subprocess
-from urllib.parse import urlparse, parse_qs
+import threading
+import functools
+import itertools
+import contextlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+from requests.adapters import HTTPAdapter
 from typing import Dict, List, Optional
 import logging
 
-from whisper_manager import preload_model, require_model
+from whisper_manager import preload_model, require_model, transcribe
+from extract_utils import parse_vtt, discard_audio
+
+# In-process yt-dlp: long-lived YoutubeDL instances per job kind (see _ydl)
+_YDL_COMMON = {
+    'js_runtimes': {'node': {}},
+    'remote_components': ['ejs:github'],
+    'quiet': True,
+    'no_warnings': True,
+    'noplaylist': True,
+    'socket_timeout': 30,
+}
+_YDL_OPTIONS = {
+    # Metadata and subtitle tracks; nothing is written to disk
+    'probe': {
+        'writesubtitles': True,
+        'writeautomaticsub': True,
+        'subtitleslangs': ['vi', 'en'],
+        'subtitlesformat': 'vtt/srt/ass/best',
+        'skip_download': True,
+    },
+    # 16kHz mono wav — optimal for Whisper
+    'audio': {
+        'format': 'bestaudio/best',
+        'outtmpl': 'audio_%(id)s.%(ext)s',
+        'postprocessors': [{'key': 'FFmpegExtractAudio', 'preferredcodec': 'wav'}],
+        'postprocessor_args': {'ffmpeg': ['-ar', '16000', '-ac', '1']},
+    },
+}
+# Formats ffmpeg can read straight from the URL (see _decode_stream)
+_STREAM_PROTOCOLS = ('http', 'https', 'm3u8', 'm3u8_native')
+# Subtitle probe outcomes remembered per platform (see _subtitles_or_audio).
+# Once at least _SUB_HISTORY_MIN are in and under _SPECULATE_BELOW of them
+# found subtitles, the audio download starts alongside the probe.
+_SUB_HISTORY = 20
+_SUB_HISTORY_MIN = 5
+_SPECULATE_BELOW = 0.25
+
+# Platform and video ID in one match: the host (any subdomain) names the
+# platform, and the optional tail captures that platform's video ID.  This is
+# the one URL table: server.py keys its result cache on the same parse.
+_URL_RE = re.compile(
+    r'(?:https?://)?(?:[^/?#\s]*\.)?(?:'
+    r'(?P<youtube>youtube\.com|youtu\.be)(?![\w.-])'
+    r'(?:\S*?(?:[?&]v=|/)(?P<youtube_id>[a-zA-Z0-9_-]{11})(?![\w-]))?'
+    r'|(?P<tiktok>tiktok\.com)(?![\w.-])(?:\S*?/video/(?P<tiktok_id>\d+))?'
+    r'|(?P<facebook>facebook\.com|fb\.watch)(?![\w.-])'
+    r'(?:\S*?(?:/videos/(?:[^/?#\s]+/)?|/reel/|[?&]v=)(?P<facebook_id>\d+))?'
+    r'|(?P<douyin>(?:ies)?douyin\.com)(?![\w.-])'
+    r'(?:\S*?(?:/video/|[?&]modal_id=)(?P<douyin_id>\d+))?)',
+    re.IGNORECASE,
+)
+_PLATFORMS = ('youtube', 'tiktok', 'facebook', 'douyin')
+# Short links that must be expanded before _URL_RE can find a video ID
+_SHORT_URL_RE = re.compile(r'(?:https?://)?v[mt]\.tiktok\.com/', re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_url(url: str) -> tuple:
+    """Return ``(platform, video_id)`` for *url*; the ID is None if absent."""
+    m = _URL_RE.match(url)
+    if m is not None:
+        for platform in _PLATFORMS:
+            if m.group(platform):
+                return platform, m.groupdict().get(f'{platform}_id')
+    return 'unknown', None
+
 
 class WhisperTranscriptExtractor:
-    def __init__(self, whisper_model='small'):
+    def __init__(self, whisper_model='small',
+                 language_models: Optional[Dict[str, str]] = None):
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         })
+        # Keep-alive pool shared by URL expansion, share-link resolution and
+        # subtitle fetches, so repeat hosts skip the TCP/TLS handshake
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
 
         # Rate limiting
         self.last_request = {}
+        self._rate_lock = threading.Lock()
         self.min_delay = {
             'youtube': 2,
             'tiktok': 3,
@@ -41,200 +121,327 @@ class WhisperTranscriptExtractor:
 
         # Whisper setup — background preload (non-blocking)
         self.whisper_model = whisper_model
+        # language -> model name, for checkpoints specialized to one language
+        # (e.g. {'en': 'distil-small.en'}); other languages use whisper_model
+        self.language_models = dict(language_models or {})
         self.temp_dir = tempfile.mkdtemp(prefix='transcript_')
 
         self.logger = logging.getLogger(__name__)
-        logging.basicConfig(level=logging.INFO)
+
+        # yt-dlp runs in-process: the interpreter start-up and extractor
+        # imports are paid once, and each YoutubeDL keeps its HTTP session
+        # and cookies across calls.  A YoutubeDL isn't thread-safe, so each
+        # call checks an idle one out of its kind's list (see _ydl).
+        self._idle_ydls = {kind: [] for kind in _YDL_OPTIONS}
+        # Per-download cancel/deadline/partial file; yt-dlp runs progress
+        # hooks on the downloading thread
+        self._audio_state = threading.local()
+        # platform -> recent subtitle probe outcomes (True = subtitles found)
+        self._sub_hits = {platform: deque(maxlen=_SUB_HISTORY)
+                          for platform in ('youtube', 'facebook')}
 
         preload_model(self.whisper_model)
+        for name in self.language_models.values():
+            preload_model(name)
 
-    def _get_whisper(self):
-        """Return the Whisper model, blocking until the background load finishes."""
-        return require_model(self.whisper_model)
+    def _get_whisper(self, language: Optional[str] = None):
+        """Return the Whisper model for *language*, blocking until the background load finishes."""
+        return require_model(self.language_models.get(language, self.whisper_model))
     
+    @contextlib.contextmanager
+    def _ydl(self, kind: str):
+        """Check out an idle YoutubeDL for *kind*, building one if all are busy."""
+        idle = self._idle_ydls[kind]
+        try:
+            ydl = idle.pop()
+        except IndexError:
+            from yt_dlp import YoutubeDL
+
+            params = dict(_YDL_COMMON, **_YDL_OPTIONS[kind])
+            params['paths'] = {'home': self.temp_dir}
+            if kind == 'audio':
+                params['progress_hooks'] = [self._audio_progress]
+            ydl = YoutubeDL(params)
+        try:
+            yield ydl
+        finally:
+            idle.append(ydl)
+
+    def _probe(self, url: str) -> Dict:
+        """Metadata and subtitle tracks for *url*, without downloading."""
+        with self._ydl('probe') as ydl:
+            return ydl.extract_info(url, download=False)
+
+    def _subtitle_tracks(self, info: Dict):
+        """Yield ``(lang, text)`` for each subtitle track yt-dlp picked.
+
+        Tracks come out in preference order (vi, then en), but their bodies
+        are fetched concurrently, so a missing or too-short Vietnamese track
+        doesn't add a second round trip before the English one.
+        """
+        tracks = [(lang, sub) for lang, sub in (info.get('requested_subtitles') or {}).items()
+                  if sub.get('ext') in ('vtt', 'srt', 'ass')]
+        if not tracks:
+            return
+        pool = ThreadPoolExecutor(max_workers=len(tracks))
+        try:
+            bodies = [sub.get('data') if sub.get('data') is not None
+                      else pool.submit(self._fetch_text, sub['url'])
+                      for _, sub in tracks]
+            for (lang, _), raw in zip(tracks, bodies):
+                if not isinstance(raw, str):
+                    raw = raw.result()
+                if raw is not None:
+                    yield lang, parse_vtt(raw)
+        finally:
+            # The caller may stop at the first usable track
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _fetch_text(self, url: str) -> Optional[str]:
+        response = self.session.get(url, timeout=15)
+        return response.text if response.status_code == 200 else None
+
     def _rate_limit(self, platform: str):
         """Rate limiting per platform"""
-        now = time.time()
-        if platform in self.last_request:
-            elapsed = now - self.last_request[platform]
-            if elapsed < self.min_delay[platform]:
-                sleep_time = self.min_delay[platform] - elapsed
-                time.sleep(sleep_time)
-        
-        self.last_request[platform] = time.time()
-    
+        # Each caller reserves the next free slot under the lock, so
+        # concurrent extractions (extract_transcripts_batch) stay spaced out
+        with self._rate_lock:
+            now = time.time()
+            slot = now
+            if platform in self.last_request:
+                slot = max(now, self.last_request[platform] + self.min_delay[platform])
+            self.last_request[platform] = slot
+        if slot > now:
+            time.sleep(slot - now)
+
     def expand_shortened_url(self, url: str) -> str:
         """Expand shortened URLs like vt.tiktok.com, vm.tiktok.com"""
-        if any(short in url for short in ['vt.tiktok.com', 'vm.tiktok.com']):
+        if _SHORT_URL_RE.match(url):
             try:
-                import requests
-                self.logger.info(f"Expanding shortened URL: {url}")
-                response = requests.head(url, allow_redirects=True, timeout=15)
+                self.logger.info("Expanding shortened URL: %s", url)
+                response = self.session.head(url, allow_redirects=True, timeout=15)
                 expanded_url = response.url.split('?')[0]  # Remove tracking params
-                self.logger.info(f"Expanded to: {expanded_url}")
+                self.logger.info("Expanded to: %s", expanded_url)
                 return expanded_url
             except Exception as e:
-                self.logger.warning(f"URL expansion failed: {e}")
+                self.logger.warning("URL expansion failed: %s", e)
                 return url
         return url
 
     def identify_platform(self, url: str) -> str:
         """Identify platform from URL"""
-        domain = urlparse(url).netloc.lower()
-        
-        if 'youtube.com' in domain or 'youtu.be' in domain:
-            return 'youtube'
-        elif 'tiktok.com' in domain:
-            return 'tiktok'
-        elif 'facebook.com' in domain or 'fb.watch' in domain:
-            return 'facebook'
-        elif 'douyin.com' in domain:
-            return 'douyin'
-        else:
-            return 'unknown'
-    
-    def extract_audio(self, video_url: str) -> Optional[str]:
-        """Extract audio from video using yt-dlp (16kHz mono wav — optimal for Whisper)"""
+        return _parse_url(url)[0]
+
+    def extract_audio(self, video_url: str,
+                      cancel: Optional[threading.Event] = None,
+                      info: Optional[Dict] = None) -> Optional[str]:
+        """Extract audio from video using yt-dlp (16kHz mono — optimal for Whisper)
+
+        Returns a 16kHz float32 sample array (streamed formats) or a wav
+        path (fragmented formats); both are accepted by Whisper.  Setting
+        *cancel* aborts the download and returns None.  A *info* dict from
+        :meth:`_probe` is reused instead of extracting the page again.
+        """
+        from yt_dlp import YoutubeDL
+        from yt_dlp.utils import DownloadCancelled
+
+        state = self._audio_state
+        state.cancel = cancel
+        state.deadline = time.monotonic() + 120
+        state.partial = None
         try:
-            audio_file = os.path.join(self.temp_dir, f"audio_{int(time.time())}.wav")
-
-            cmd = [
-                'yt-dlp', '--js-runtimes', 'node',
-                '--remote-components', 'ejs:github',
-                '--extract-audio',
-                '--audio-format', 'wav',
-                '--postprocessor-args', 'ffmpeg:-ar 16000 -ac 1',
-                '--output', audio_file.replace('.wav', '.%(ext)s'),
-                video_url
-            ]
-
-            self.logger.info(f"Extracting audio: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-
-            if result.returncode == 0:
-                # Find the actual audio file (yt-dlp may change extension)
-                for ext in ['wav', 'mp3', 'm4a', 'webm']:
-                    potential_file = audio_file.replace('.wav', f'.{ext}')
-                    if os.path.exists(potential_file):
-                        self.logger.info(f"Audio extracted: {potential_file}")
-                        return potential_file
-
-                # If exact match not found, look for any audio file
-                audio_dir = os.path.dirname(audio_file)
-                for file in os.listdir(audio_dir):
-                    if file.startswith('audio_') and file.endswith(('.wav', '.mp3', '.m4a', '.webm')):
-                        audio_path = os.path.join(audio_dir, file)
-                        self.logger.info(f"Found audio file: {audio_path}")
-                        return audio_path
-
-                self.logger.warning("Audio extraction completed but file not found")
-                return None
-            else:
-                self.logger.error(f"Audio extraction failed: {result.stderr}")
-                return None
+            self.logger.info("Extracting audio: %s", video_url)
+            with self._ydl('audio') as ydl:
+                if info is None:
+                    info = ydl.extract_info(video_url, download=False)
+                else:
+                    # Drop the probe's own selections and pick the audio format
+                    info = ydl.process_ie_result(YoutubeDL.sanitize_info(info, True),
+                                                 download=False)
+                if info.get('url') and info.get('protocol') in _STREAM_PROTOCOLS:
+                    audio = self._decode_stream(info)
+                    if audio is not None:
+                        return audio
+                    # ffmpeg couldn't read the URL (expired/signed URL, 403,
+                    # header checks): let yt-dlp's downloader handle it
+
+                # Fragmented (DASH) formats: yt-dlp downloads, ffmpeg converts
+                info = ydl.process_ie_result(info, download=True)
+            for download in info.get('requested_downloads') or ():
+                audio_file = download.get('filepath')
+                if audio_file and os.path.exists(audio_file):
+                    self.logger.info("Audio extracted: %s", audio_file)
+                    return audio_file
+
+            self.logger.warning("Audio extraction completed but file not found")
+            return None
 
-        except subprocess.TimeoutExpired:
-            self.logger.error("Audio extraction timed out")
+        except DownloadCancelled:
+            if cancel is None or not cancel.is_set():
+                self.logger.error("Audio extraction timed out")
+            if state.partial:
+                self._discard_partial(state.partial)
             return None
         except Exception as e:
-            self.logger.error(f"Audio extraction error: {e}")
+            self.logger.error("Audio extraction error: %s", e)
             return None
-    
-    def transcribe_audio(self, audio_file: str) -> Optional[str]:
+        finally:
+            state.cancel = None
+
+    def _decode_stream(self, info: Dict):
+        """Decode the selected audio format into a 16kHz mono float32 array.
+
+        A single ffmpeg reads the stream URL, resamples and downmixes, and
+        writes raw float32 PCM to its stdout — an array Whisper takes as-is,
+        so the audio never touches disk.  Returns None if ffmpeg fails.
+        """
+        import numpy as np
+
+        cmd = ['ffmpeg', '-nostdin', '-loglevel', 'error']
+        headers = info.get('http_headers')
+        if headers:
+            cmd += ['-headers', ''.join(f'{k}: {v}\r\n' for k, v in headers.items())]
+        cmd += ['-i', info['url'], '-vn', '-ar', '16000', '-ac', '1',
+                '-f', 'f32le', 'pipe:1']
+
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        while True:
+            try:
+                pcm, stderr = proc.communicate(timeout=0.5)
+                break
+            except subprocess.TimeoutExpired:
+                try:
+                    self._check_abort()
+                except Exception:
+                    proc.kill()
+                    proc.communicate()
+                    raise
+
+        if proc.returncode != 0 or not pcm:
+            self.logger.warning("Streamed audio decode failed, downloading instead: %s",
+                                stderr.decode(errors='replace'))
+            return None
+        audio = np.frombuffer(pcm, dtype=np.float32)
+        self.logger.info("Audio extracted: %.1fs decoded in memory", audio.shape[0] / 16000)
+        return audio
+
+    def _audio_progress(self, status: Dict) -> None:
+        """yt-dlp progress hook for the fallback download path."""
+        state = self._audio_state
+        state.partial = status.get('filename') or state.partial
+        self._check_abort()
+
+    def _check_abort(self) -> None:
+        """Raise DownloadCancelled on cancel or once past the deadline."""
+        from yt_dlp.utils import DownloadCancelled
+
+        state = self._audio_state
+        if state.cancel is not None and state.cancel.is_set():
+            raise DownloadCancelled('cancelled')
+        if time.monotonic() > state.deadline:
+            raise DownloadCancelled('timed out')
+
+    def _discard_partial(self, audio_file: str) -> None:
+        """Remove whatever an aborted download left behind for *audio_file*."""
+        stem = os.path.splitext(os.path.basename(audio_file))[0]
+        for entry in os.scandir(self.temp_dir):
+            if entry.name.startswith(stem):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    def _subtitles_or_audio(self, url: str, video_id: str, platform: str):
+        """Check for subtitles, falling back to the audio when none are usable.
+
+        Returns ``(sub_result, audio_file)``, exactly one of them set (or
+        neither on failure).  Normally the probe runs first and a miss
+        downloads the audio from the probe's own extraction, so a subtitle
+        hit costs one request.  When subtitles have been rare on *platform*
+        lately, Whisper will most likely be needed: the download then starts
+        alongside the probe to hide the probe's latency.
+        """
+        history = self._sub_hits[platform]
+        outcomes = tuple(history)
+        if (len(outcomes) >= _SUB_HISTORY_MIN
+                and sum(outcomes) < _SPECULATE_BELOW * len(outcomes)):
+            return self._speculative_audio(url, video_id, history)
+
+        try:
+            info = self._probe(url)
+        except Exception as e:
+            self.logger.warning("Subtitle probe failed: %s", e)
+            return None, self.extract_audio(url)
+        sub_result = self._check_subtitles(info, video_id)
+        history.append(sub_result is not None)
+        if sub_result is not None:
+            return sub_result, None
+        return None, self.extract_audio(url, info=info)
+
+    def _speculative_audio(self, url: str, video_id: str, history: deque):
+        """Run the subtitle probe while the audio downloads in the background.
+
+        Same contract as :meth:`_subtitles_or_audio`; when subtitles turn
+        up after all, the download is cancelled.
+        """
+        cancel = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=1)
+        audio_future = pool.submit(self.extract_audio, url, cancel)
+        try:
+            sub_result = None
+            try:
+                info = self._probe(url)
+            except Exception as e:
+                self.logger.warning("Subtitle probe failed: %s", e)
+            else:
+                sub_result = self._check_subtitles(info, video_id)
+                history.append(sub_result is not None)
+            if sub_result is not None:
+                # The download may already have finished; don't leak its file
+                audio_future.add_done_callback(self._discard_unused_audio)
+                return sub_result, None
+            return None, audio_future.result()
+        finally:
+            cancel.set()  # no-op once the download has finished
+            pool.shutdown(wait=False)
+
+    @staticmethod
+    def _discard_unused_audio(future) -> None:
+        if future.exception() is None:
+            discard_audio(future.result())
+
+    def transcribe_audio(self, audio_file, language: str = "vi") -> Optional[str]:
         """Transcribe audio using Whisper"""
-        whisper = self._get_whisper()
+        whisper = self._get_whisper(language)
         if not whisper:
             self.logger.warning("Whisper not available, skipping audio transcription")
             return None
 
         try:
-            self.logger.info(f"Transcribing audio: {audio_file}")
-            result = whisper.transcribe(audio_file, language="vi")
-            
-            transcript = result["text"].strip()
-            self.logger.info(f"Transcription completed: {len(transcript)} characters")
+            self.logger.info("Transcribing audio: %s",
+                             audio_file if isinstance(audio_file, str) else 'in-memory audio')
+            transcript = transcribe(whisper, audio_file, language=language, batch_size=16)
+            self.logger.info("Transcription completed: %d characters", len(transcript))
             return transcript
             
         except Exception as e:
-            self.logger.error(f"Audio transcription failed: {e}")
+            self.logger.error("Audio transcription failed: %s", e)
             return None
     
-    @staticmethod
-    def _parse_vtt(raw: str) -> str:
-        """Convert VTT/SRT subtitle content to clean plain text."""
-        lines = []
-        seen = set()
-        for line in raw.splitlines():
-            line = line.strip()
-            # Skip VTT headers, timestamps, and positioning metadata
-            if not line or line.startswith(('WEBVTT', 'Kind:', 'Language:',
-                                           'NOTE', 'STYLE')):
-                continue
-            if '-->' in line:
-                continue
-            if line.isdigit():
-                continue
-            # Strip VTT inline tags like <00:00:00.240><c>...</c>
-            clean = re.sub(r'<[^>]+>', '', line).strip()
-            if not clean:
-                continue
-            # Deduplicate consecutive identical lines (VTT repeats them)
-            if clean not in seen:
-                lines.append(clean)
-                seen.add(clean)
-            # Reset seen set periodically to handle recurring phrases
-            if len(seen) > 200:
-                seen.clear()
-        return '\n'.join(lines)
-
-    def _check_subtitles(self, url: str, video_id: str) -> Optional[Dict]:
-        """Check for existing subtitles. Uses --print-to-file to get the
-        title in the same yt-dlp call (zero extra cost)."""
+    def _check_subtitles(self, info: Dict, video_id: str) -> Optional[Dict]:
+        """Check *info* for existing subtitles; the title comes from the same
+        yt-dlp extraction (zero extra cost)."""
         try:
-            title_file = os.path.join(self.temp_dir, '.title.txt')
-            cmd = [
-                'yt-dlp', '--js-runtimes', 'node',
-                '--remote-components', 'ejs:github',
-                '--write-subs', '--write-auto-subs',
-                '--sub-lang', 'vi,en', '--skip-download',
-                '--print-to-file', 'title', title_file,
-                '--paths', self.temp_dir,
-                '-o', '%(id)s.%(ext)s',
-                url
-            ]
-            subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-
-            # Read title
-            title = video_id
-            if os.path.exists(title_file):
-                try:
-                    with open(title_file, 'r', encoding='utf-8') as fh:
-                        title = fh.read().strip() or video_id
-                except Exception:
-                    pass
-                os.remove(title_file)
-
-            # Scan temp_dir for any subtitle file yt-dlp wrote
-            for f in sorted(os.listdir(self.temp_dir)):
-                if f.endswith(('.vtt', '.srt', '.ass')):
-                    sub_path = os.path.join(self.temp_dir, f)
-                    lang = "auto"
-                    for l in ['vi', 'en']:
-                        if f'.{l}.' in f:
-                            lang = l
-                            break
-                    with open(sub_path, 'r', encoding='utf-8') as fh:
-                        raw = fh.read()
-                    os.remove(sub_path)
-                    content = self._parse_vtt(raw)
-                    if len(content.strip()) > 20:
-                        return {
-                            "success": True,
-                            "title": title,
-                            "transcript": content,
-                            "source": f"yt-dlp_subs_{lang}",
-                            "language": lang
-                        }
+            title = info.get('title') or video_id
+            for lang, content in self._subtitle_tracks(info):
+                if len(content.strip()) > 20:
+                    return {
+                        "success": True,
+                        "title": title,
+                        "transcript": content,
+                        "source": f"yt-dlp_subs_{lang}",
+                        "language": lang
+                    }
         except Exception:
             pass
         return None
@@ -244,24 +451,22 @@ class WhisperTranscriptExtractor:
         self._rate_limit('youtube')
 
         try:
-            video_id_match = re.search(r'(?:v=|/)([a-zA-Z0-9_-]{11})', url)
-            if not video_id_match:
+            video_id = _parse_url(url)[1]
+            if not video_id:
                 return {"error": "Invalid YouTube URL"}
 
-            video_id = video_id_match.group(1)
-
-            # Fast path: try subtitles first (single yt-dlp call, ~10s).
-            sub_result = self._check_subtitles(url, video_id)
+            # Subtitles (single yt-dlp call, ~10s); the audio follows from
+            # the same extraction, or runs alongside when a miss is likely.
+            sub_result, audio_file = self._subtitles_or_audio(url, video_id, 'youtube')
             if sub_result is not None:
                 return sub_result
 
-            # Slow path: no subtitles — download audio and transcribe.
+            # Slow path: no subtitles — transcribe the downloaded audio.
             self.logger.info("No subtitles found, trying audio transcription...")
-            audio_file = self.extract_audio(url)
 
-            if audio_file:
+            if audio_file is not None:
                 transcript = self.transcribe_audio(audio_file)
-                os.remove(audio_file)  # Cleanup
+                discard_audio(audio_file)  # Cleanup
 
                 if transcript:
                     return {
@@ -277,30 +482,14 @@ class WhisperTranscriptExtractor:
         except Exception as e:
             return {"error": f"YouTube extraction failed: {str(e)}"}
     
-    def _check_tiktok_subtitles(self, url: str) -> Optional[str]:
-        """Try fetching TikTok auto-captions via yt-dlp."""
+    def _check_tiktok_subtitles(self, url: str, info: Optional[Dict] = None) -> Optional[str]:
+        """Try fetching TikTok captions via yt-dlp (reusing *info* if given)."""
         try:
-            cmd = [
-                'yt-dlp', '--js-runtimes', 'node',
-                '--remote-components', 'ejs:github',
-                '--write-auto-subs',
-                '--sub-lang', 'vi,en',
-                '--skip-download',
-                '--paths', self.temp_dir,
-                '-o', '%(id)s.%(ext)s',
-                url
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            if result.returncode == 0:
-                for f in os.listdir(self.temp_dir):
-                    if f.endswith(('.vtt', '.srt', '.ass')):
-                        sub_path = os.path.join(self.temp_dir, f)
-                        with open(sub_path, 'r', encoding='utf-8') as fh:
-                            raw = fh.read()
-                        os.remove(sub_path)
-                        content = self._parse_vtt(raw)
-                        if len(content.strip()) > 20:
-                            return content
+            if info is None:
+                info = self._probe(url)
+            for _lang, content in self._subtitle_tracks(info):
+                if len(content.strip()) > 20:
+                    return content
         except Exception:
             pass
         return None
@@ -310,27 +499,24 @@ class WhisperTranscriptExtractor:
         self._rate_limit('tiktok')
 
         try:
-            video_id_match = re.search(r'/video/(\d+)', url)
-            if not video_id_match:
+            video_id = _parse_url(url)[1]
+            if not video_id:
                 return {"error": "Could not find TikTok video ID"}
 
-            video_id = video_id_match.group(1)
-
             try:
-                cmd = ['yt-dlp', '--print', 'title,uploader,upload_date', url]
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+                # One extraction gives both the metadata and the captions
+                info = self._probe(url)
 
-                if result.returncode == 0:
-                    lines = result.stdout.strip().split('\n')
-                    title = lines[0] if len(lines) > 0 else ""
-                    uploader = lines[1] if len(lines) > 1 else ""
-                    upload_date = lines[2] if len(lines) > 2 else ""
+                if info:
+                    title = info.get('title') or ""
+                    uploader = info.get('uploader') or ""
+                    upload_date = info.get('upload_date') or ""
 
                     metadata = f"{title}. Creator: @{uploader}. Posted: {upload_date}"
 
                     # --- Subtitle-first: try auto-captions before Whisper ---
                     self.logger.info("Checking TikTok auto-captions...")
-                    sub_text = self._check_tiktok_subtitles(url)
+                    sub_text = self._check_tiktok_subtitles(url, info)
                     if sub_text:
                         full_content = f"{sub_text}\n\n--- Metadata ---\n{metadata}"
                         return {
@@ -343,11 +529,11 @@ class WhisperTranscriptExtractor:
 
                     # --- Fallback: audio transcription ---
                     self.logger.info("No auto-captions, extracting audio for transcription...")
-                    audio_file = self.extract_audio(url)
+                    audio_file = self.extract_audio(url, info=info)
 
-                    if audio_file:
+                    if audio_file is not None:
                         transcript = self.transcribe_audio(audio_file)
-                        os.remove(audio_file)  # Cleanup
+                        discard_audio(audio_file)  # Cleanup
 
                         if transcript and len(transcript.strip()) > 10:
                             full_content = f"{transcript}\n\n--- Metadata ---\n{metadata}"
@@ -369,7 +555,7 @@ class WhisperTranscriptExtractor:
                     }
 
             except Exception as e:
-                self.logger.error(f"TikTok extraction error: {e}")
+                self.logger.error("TikTok extraction error: %s", e)
 
             return {"error": "TikTok extraction failed"}
 
@@ -380,11 +566,11 @@ class WhisperTranscriptExtractor:
         """Resolve Facebook /share/v/ short links to their canonical URL."""
         if '/share/v/' in url:
             try:
-                resp = requests.get(url, allow_redirects=True, timeout=10,
-                                    headers={'User-Agent': 'curl/8.0'})
+                resp = self.session.get(url, allow_redirects=True, timeout=10,
+                                        headers={'User-Agent': 'curl/8.0'})
                 resolved = resp.url.split('?')[0]
                 if resolved != url:
-                    self.logger.info(f"Resolved FB share URL → {resolved}")
+                    self.logger.info("Resolved FB share URL → %s", resolved)
                     return resolved
             except Exception:
                 pass
@@ -396,21 +582,17 @@ class WhisperTranscriptExtractor:
         url = self._resolve_facebook_url(url)
 
         # Try subtitles first (same approach as YouTube)
-        video_id = re.search(r'/(?:videos|reel)/(\d+)', url)
-        if not video_id:
-            video_id = re.search(r'v=(\d+)', url)
-        vid = video_id.group(1) if video_id else 'facebook'
+        vid = _parse_url(url)[1] or 'facebook'
 
-        sub_result = self._check_subtitles(url, vid)
+        sub_result, audio_file = self._subtitles_or_audio(url, vid, 'facebook')
         if sub_result is not None:
             return sub_result
 
-        # Fallback: download audio and transcribe with Whisper
+        # Fallback: transcribe the downloaded audio with Whisper
         self.logger.info("No Facebook subtitles found, trying audio transcription...")
-        audio_file = self.extract_audio(url)
-        if audio_file:
+        if audio_file is not None:
             transcript = self.transcribe_audio(audio_file)
-            os.remove(audio_file)
+            discard_audio(audio_file)
             if transcript:
                 return {
                     "success": True,
@@ -427,27 +609,68 @@ class WhisperTranscriptExtractor:
         # Expand shortened URLs first
         url = self.expand_shortened_url(url)
         platform = self.identify_platform(url)
-        self.logger.info(f"Processing {platform} video: {url.split('/')[-1][:20]}...")
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info("Processing %s video: %s...", platform, url.split('/')[-1][:20])
         
         if platform == 'youtube':
-            return self.extract_youtube(url)
+            result = self.extract_youtube(url)
         elif platform == 'tiktok':
-            return self.extract_tiktok(url)
+            result = self.extract_tiktok(url)
         elif platform == 'facebook':
-            return {"error": "Facebook support not implemented yet"}
+            result = {"error": "Facebook support not implemented yet"}
         elif platform == 'douyin':
-            return {"error": "Douyin support not implemented yet"}
+            result = {"error": "Douyin support not implemented yet"}
         else:
-            return {"error": f"Unsupported platform: {platform}"}
+            result = {"error": f"Unsupported platform: {platform}"}
+        result['platform'] = platform
+        return result
     
+    def extract_transcripts_batch(self, urls: List[str], max_workers: int = 4) -> List[Dict]:
+        """Extract several URLs concurrently; results come back in input order.
+
+        Probes and downloads for different URLs overlap, and their Whisper
+        calls meet in whisper_manager's batcher, so one clip is decoded
+        while the next ones are still downloading.
+        """
+        # Round-robin over platforms, so workers sitting out one platform's
+        # _rate_limit cooldown don't hold back URLs for the others
+        by_platform: Dict[str, List[int]] = {}
+        for i, url in enumerate(urls):
+            by_platform.setdefault(_parse_url(url)[0], []).append(i)
+        order = [i for group in itertools.zip_longest(*by_platform.values())
+                 for i in group if i is not None]
+
+        results: List[Optional[Dict]] = [None] * len(urls)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for i, result in zip(order, pool.map(self.extract_transcript,
+                                                 [urls[i] for i in order])):
+                results[i] = result
+        return results
+
     def cleanup(self):
         """Clean up temporary files"""
+        for idle in self._idle_ydls.values():
+            while idle:
+                idle.pop().close()
         try:
-            import shutil
-            shutil.rmtree(self.temp_dir)
+            with os.scandir(self.temp_dir) as entries:
+                paths = [entry.path for entry in entries]
+            # Unlinks are issued side by side rather than one tree walk
+            if paths:
+                with ThreadPoolExecutor(max_workers=min(16, len(paths))) as pool:
+                    list(pool.map(self._remove_path, paths))
+            os.rmdir(self.temp_dir)
             self.logger.info("Cleanup completed")
         except Exception as e:
-            self.logger.warning(f"Cleanup failed: {e}")
+            self.logger.warning("Cleanup failed: %s", e)
+
+    @staticmethod
+    def _remove_path(path: str) -> None:
+        if os.path.isdir(path) and not os.path.islink(path):
+            import shutil
+            shutil.rmtree(path)
+        else:
+            os.unlink(path)
 
 def main():
     import sys
@@ -459,6 +682,10 @@ def main():
                         help='Whisper model name (default: small). Use large-v3 for higher accuracy.')
     args = parser.parse_args()
 
+    # Logging is configured by the entry point (here, or server.py), not
+    # on every extractor construction
+    logging.basicConfig(level=logging.INFO)
+
     url = args.url
     extractor = WhisperTranscriptExtractor(whisper_model=args.model)
 
@@ -468,7 +695,7 @@ def main():
 
         if "success" in result:
             print("\nSuccess!")
-            print(f"Platform: {extractor.identify_platform(url).upper()}")
+            print(f"Platform: {result.get('platform', 'unknown').upper()}")
             print(f"Title: {result.get('title', 'N/A')}")
             print(f"Source: {result.get('source', 'N/A')}")
             print(f"Language: {result.get('language', 'N/A')}")
@@ -476,7 +703,7 @@ def main():
             print(f"\nContent:\n{result['transcript'][:500]}{'...' if len(result['transcript']) > 500 else ''}")
 
             # Save to file
-            filename = f"transcript_{extractor.identify_platform(url)}_{int(time.time())}.txt"
+            filename = f"transcript_{result.get('platform', 'unknown')}_{int(time.time())}.txt"
             with open(filename, 'w', encoding='utf-8') as f:
                 f.write(result['transcript'])
             print(f"Saved: {filename}")
@@ -1,83 +1,392 @@
 """
 Shared Whisper Model Manager — singleton with background loading.
 
-All extractors share a single Whisper model instance, loaded in a background
-thread so that constructors return instantly.
+All extractors share one Whisper model instance per model size, loaded in a
+background thread so that constructors return instantly.  The backend is faster-whisper
+(CTranslate2): int8-quantized weights with fused kernels, ~4x faster than the
+reference openai/whisper implementation at the same accuracy.
 
 Usage:
-    from whisper_manager import preload_model, require_model
+    from whisper_manager import preload_model, require_model, transcribe
     preload_model('small')          # fire-and-forget (non-blocking)
     model = require_model('small')  # blocks until ready
+    text = transcribe(model, 'audio.wav', language='vi')
 """
 
+import os
+import time
+import queue
+import bisect
 import threading
 import logging
+import functools
+import weakref
 from concurrent.futures import ThreadPoolExecutor, Future
 
 logger = logging.getLogger(__name__)
 
 _lock = threading.Lock()
 _executor = ThreadPoolExecutor(max_workers=1)
-_model_name: str | None = None
-_model_future: Future | None = None
-_model = None
+# (name, device, compute_type) -> Future resolving to the loaded model.  Each
+# model is loaded once per process and shared by every extractor/thread.
+_models: dict[tuple[str, str, str], Future] = {}
+_pipelines = weakref.WeakKeyDictionary()  # model -> BatchedInferencePipeline
+# Inference slots (see _inference_workers): callers download and demux
+# concurrently, but encoder/decoder passes queue here instead of
+# contending for the device.
+_inference_slots: threading.BoundedSemaphore | None = None
 
+# Silero VAD: split on pauses of 500 ms or more (faster-whisper's default is
+# 2 s), so music intros and gaps between phrases are cut before the encoder.
+_VAD_PARAMETERS = {"min_silence_duration_ms": 500}
 
-def _load_model(name: str):
+# Cross-request batching (see submit): up to _BATCH_MAX clips that arrive
+# within _BATCH_WAIT seconds of each other share encoder/decoder batches.
+_BATCH_MAX = 4
+_BATCH_WAIT = 0.05
+_batch_queue: queue.SimpleQueue = queue.SimpleQueue()
+_batch_threads: list[threading.Thread] = []
+
+
+@functools.lru_cache(maxsize=None)
+def _pick_device() -> tuple[str, str]:
+    """Return ``(device, compute_type)`` for the current host.
+
+    On GPU, the first type the device supports in order of preference:
+    ``int8_float16`` (int8 weights, tensor-core GEMMs — sm70+), then
+    ``float16`` for cards without int8 GEMM support, then plain ``int8``.
+    CPU-only hosts use ``int8``.  ``WHISPER_COMPUTE_TYPE`` overrides the
+    choice when the device supports it.
+    """
+    try:
+        import ctranslate2
+    except ImportError:
+        # faster-whisper isn't installed; _load_model reports that properly
+        return "cpu", "int8"
+
+    device = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+    supported = ctranslate2.get_supported_compute_types(device)
+
+    override = os.environ.get("WHISPER_COMPUTE_TYPE")
+    if override:
+        if override in supported:
+            return device, override
+        logger.warning(f"WHISPER_COMPUTE_TYPE={override} not supported on {device}, ignoring")
+
+    preferred = ("int8_float16", "float16", "int8") if device == "cuda" else ("int8",)
+    for compute_type in preferred:
+        if compute_type in supported:
+            return device, compute_type
+    return device, "default"
+
+
+def device_info() -> tuple[str, str]:
+    """Return the ``(device, compute_type)`` models are loaded with."""
+    return _pick_device()
+
+
+@functools.lru_cache(maxsize=None)
+def _inference_workers() -> int:
+    """Return how many transcriptions may run at once.
+
+    One on GPU, where concurrent runs only contend for the same device.
+    On CPU, one per four cores: CTranslate2 gives each worker 4 intra-op
+    threads, so this fills the machine without oversubscribing it.
+    ``WHISPER_INFERENCE_WORKERS`` overrides the choice.
+    """
+    override = os.environ.get("WHISPER_INFERENCE_WORKERS")
+    if override:
+        return max(1, int(override))
+    if _pick_device()[0] == "cuda":
+        return 1
+    return max(1, (os.cpu_count() or 1) // 4)
+
+
+def _slots() -> threading.BoundedSemaphore:
+    global _inference_slots
+    with _lock:
+        if _inference_slots is None:
+            _inference_slots = threading.BoundedSemaphore(_inference_workers())
+    return _inference_slots
+
+
+def _model_path(name: str) -> str:
+    """Return the local directory holding *name*'s converted weights.
+
+    The Hugging Face cache is shared by every process on the host, so after
+    the first download a new worker only reads model.bin (usually straight
+    from the page cache).  Looking there first skips the Hub revision check
+    that ``WhisperModel(name)`` would otherwise make on every start-up.
+    """
+    if os.path.isdir(name):
+        return name
+
+    from faster_whisper.utils import download_model
+    from huggingface_hub.utils import LocalEntryNotFoundError
+
+    try:
+        return download_model(name, local_files_only=True)
+    except LocalEntryNotFoundError:
+        return download_model(name)
+
+
+def _load_model(name: str, device: str, compute_type: str):
     """Load a Whisper model (runs in background thread)."""
-    import whisper
-    logger.info(f"Loading Whisper model: {name}")
-    model = whisper.load_model(name)
+    from faster_whisper import WhisperModel
+
+    logger.info(f"Loading Whisper model: {name} ({device}, {compute_type})")
+    # num_workers lets that many transcribe calls run in parallel in CTranslate2
+    model = WhisperModel(_model_path(name), device=device, compute_type=compute_type,
+                         num_workers=_inference_workers())
+    if device == "cuda":
+        _use_gpu_features(model)
+    _warm_up(model)
     logger.info(f"Whisper model '{name}' loaded successfully!")
     return model
 
 
-def preload_model(name: str) -> None:
-    """Start loading *name* in the background (non-blocking, fire-and-forget)."""
-    global _model_name, _model_future, _model
+def _warm_up(model) -> None:
+    """Run one throwaway window so CUDA/cuFFT init happens during preload.
 
-    with _lock:
-        # Already loaded or loading the same model — nothing to do.
-        if _model_name == name and (_model is not None or _model_future is not None):
+    The first encoder pass pays for kernel selection, cuBLAS/cuFFT plan
+    creation and memory-pool growth; doing it here keeps that off the first
+    real request.  VAD is off, otherwise the silent clip never reaches the
+    encoder.
+    """
+    import numpy as np
+
+    try:
+        segments, _info = model.transcribe(np.zeros(16000, dtype=np.float32),
+                                           language="en", beam_size=1)
+        for _ in segments:
+            pass
+    except Exception as e:
+        logger.info(f"Whisper warm-up skipped: {e}")
+
+
+def _use_gpu_features(model) -> None:
+    """Compute log-mel features on the GPU when torch can see CUDA."""
+    try:
+        import torch
+        if not torch.cuda.is_available():
             return
+        from gpu_feature_extractor import GPUFeatureExtractor
+        model.feature_extractor = GPUFeatureExtractor(**model.feat_kwargs)
+        logger.info("Using GPU log-mel feature extraction")
+    except Exception as e:
+        logger.info(f"GPU feature extraction unavailable, using CPU: {e}")
 
-        _model_name = name
-        _model = None
-        _model_future = _executor.submit(_load_model, name)
+
+def _model_future(name: str) -> Future:
+    """Return the load future for *name*, submitting the load if needed."""
+    key = (name, *_pick_device())
+    with _lock:
+        future = _models.get(key)
+        if future is None:
+            future = _models[key] = _executor.submit(_load_model, *key)
+    return future
+
+
+def preload_model(name: str) -> None:
+    """Start loading *name* in the background (non-blocking, fire-and-forget)."""
+    _model_future(name)
 
 
 def require_model(name: str):
     """Return the loaded model, blocking if the background load is still in progress.
 
-    If no preload was started or a *different* model is requested, this will
-    load synchronously.
+    If no preload was started, this loads synchronously.  Every caller asking
+    for the same *name* gets the same instance.
     """
-    global _model_name, _model_future, _model
-
-    with _lock:
-        # Fast path: already resolved.
-        if _model is not None and _model_name == name:
-            return _model
-
-        # A preload is in progress for the right model — wait on it.
-        if _model_future is not None and _model_name == name:
-            future = _model_future
-        else:
-            # Either no preload, or different model requested — load now.
-            _model_name = name
-            _model_future = _executor.submit(_load_model, name)
-            future = _model_future
+    future = _model_future(name)
 
     # Wait outside the lock so other threads aren't blocked.
     try:
-        result = future.result()
+        return future.result()
     except Exception as e:
         logger.error(f"Failed to load Whisper model '{name}': {e}")
         with _lock:
-            _model_future = None
+            # Drop the failed load so the next call retries it.
+            key = (name, *_pick_device())
+            if _models.get(key) is future:
+                del _models[key]
         return None
 
+
+def _batched_pipeline(model):
+    """Return the (cached) BatchedInferencePipeline wrapping *model*."""
+    with _lock:
+        pipeline = _pipelines.get(model)
+        if pipeline is None:
+            from faster_whisper import BatchedInferencePipeline
+            pipeline = BatchedInferencePipeline(model=model)
+            _pipelines[model] = pipeline
+    return pipeline
+
+
+def detect_speech(audio, min_speech_duration_ms: int = 500):
+    """Return *audio* as a 16 kHz float32 array if it contains speech, else None.
+
+    Runs only Silero VAD — a fraction of a second even on long clips — so
+    callers can reject music-only candidates before paying for an encoder
+    pass.  The decoded array can be handed straight to :func:`transcribe`.
+    """
+    from faster_whisper.audio import decode_audio
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    if isinstance(audio, str):
+        audio = decode_audio(audio, sampling_rate=16000)
+    options = VadOptions(min_speech_duration_ms=min_speech_duration_ms,
+                         **_VAD_PARAMETERS)
+    return audio if get_speech_timestamps(audio, options) else None
+
+
+def transcribe(model, audio, language: str | None = None,
+               batch_size: int | None = None) -> str:
+    """Transcribe *audio* (file path or 16 kHz float32 array) with *model*.
+
+    Greedy decoding (beam_size=1) with Silero VAD filtering, so silent
+    stretches never reach the encoder.  With *batch_size*, the VAD chunks
+    (<= 30 s each) are decoded together through faster-whisper's
+    BatchedInferencePipeline instead of one window at a time.
+
+    With both *batch_size* and *language*, the call goes through
+    :func:`submit`, so clips transcribed concurrently (e.g. by several server
+    requests) are decoded together.
+
+    faster-whisper yields segments lazily; the actual inference happens
+    while they are joined here, holding one of the inference slots.
+    """
+    if batch_size and language:
+        return submit(model, audio, language, batch_size).result()
+    return _transcribe_now(model, audio, language, batch_size)
+
+
+def _transcribe_now(model, audio, language: str | None,
+                    batch_size: int | None) -> str:
+    # Copied per call: BatchedInferencePipeline pops keys from the dict.
+    vad_parameters = dict(_VAD_PARAMETERS)
+    with _slots():
+        if batch_size:
+            segments, _info = _batched_pipeline(model).transcribe(
+                audio, language=language, beam_size=1, vad_filter=True,
+                vad_parameters=vad_parameters, batch_size=batch_size)
+        else:
+            segments, _info = model.transcribe(audio, language=language,
+                                               beam_size=1, vad_filter=True,
+                                               vad_parameters=vad_parameters)
+        return "".join(segment.text for segment in segments).strip()
+
+
+def submit(model, audio, language: str, batch_size: int = 16) -> Future:
+    """Queue *audio* for batched transcription; return a Future for its text.
+
+    Background threads (one per inference slot, so a single one on GPU)
+    drain the queue: clips for the same model and language are concatenated
+    and decoded in one BatchedInferencePipeline run, so the GPU sees full
+    batches even when each clip alone has only a chunk or two of speech.
+    """
+    future = Future()
+    workers = _inference_workers()
     with _lock:
-        _model = result
-        _model_future = None
-    return result
+        while len(_batch_threads) < workers:
+            thread = threading.Thread(target=_batch_loop, daemon=True,
+                                      name=f"whisper-batcher-{len(_batch_threads)}")
+            thread.start()
+            _batch_threads.append(thread)
+    _batch_queue.put((model, audio, language, batch_size, future))
+    return future
+
+
+def _batch_loop() -> None:
+    while True:
+        batch = [_batch_queue.get()]
+        deadline = time.monotonic() + _BATCH_WAIT
+        while len(batch) < _BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_batch_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        # One tokenizer (language) per pipeline run
+        groups: dict[tuple, list] = {}
+        for model, audio, language, batch_size, future in batch:
+            groups.setdefault((model, language), []).append((audio, batch_size, future))
+
+        for (model, language), items in groups.items():
+            _transcribe_group(model, language, items)
+
+
+def _transcribe_group(model, language: str, items: list) -> None:
+    """Resolve the ``(audio, batch_size, future)`` *items* with one pipeline run."""
+    # Decode and VAD each clip on its own, so one unreadable file fails
+    # only its own request rather than the whole group
+    prepared, futures = [], []
+    for audio, _, future in items:
+        try:
+            prepared.append(_prepare_clip(audio))
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            futures.append(future)
+    if not prepared:
+        return
+    batch_size = max(size for _, size, _ in items)
+    try:
+        texts = _transcribe_together(model, prepared, language, batch_size)
+    except Exception as e:
+        for future in futures:
+            future.set_exception(e)
+    else:
+        for future, text in zip(futures, texts):
+            future.set_result(text)
+
+def _prepare_clip(audio):
+    """Return ``(samples, speech)`` for *audio*: 16 kHz float32 samples plus
+    its VAD speech chunks (<= 30 s each, in samples)."""
+    from faster_whisper.audio import decode_audio
+    from faster_whisper.vad import VadOptions, get_speech_timestamps, merge_segments
+
+    if isinstance(audio, str):
+        audio = decode_audio(audio, sampling_rate=16000)
+    options = VadOptions(max_speech_duration_s=30, **_VAD_PARAMETERS)
+    return audio, merge_segments(get_speech_timestamps(audio, options), options)
+
+
+def _transcribe_together(model, prepared: list, language: str,
+                         batch_size: int) -> list[str]:
+    """Transcribe several clips in one pipeline run; return their texts in order.
+
+    *prepared* holds :func:`_prepare_clip` results.  Each clip's VAD chunks
+    are offset into one concatenated array, so no chunk straddles two clips;
+    segments are routed back by start time.  That relies on the pipeline
+    keeping each ``clip_timestamps`` entry a chunk of its own (true of
+    faster-whisper 1.1.x, hence the version cap).  Chunks are decoded longest
+    first: a batch of similar-length chunks finishes decoding together
+    instead of waiting on one long straggler.
+    """
+    import numpy as np
+
+    arrays, clips, ends, offset = [], [], [], 0
+    for audio, speech in prepared:
+        for clip in speech:
+            clips.append({"start": clip["start"] + offset, "end": clip["end"] + offset})
+        arrays.append(audio)
+        offset += audio.shape[0]
+        ends.append(offset / 16000)
+
+    clips.sort(key=lambda clip: clip["end"] - clip["start"], reverse=True)
+    texts = [[] for _ in prepared]
+    if clips:
+        audio = arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+        with _slots():
+            segments, _info = _batched_pipeline(model).transcribe(
+                audio, language=language, beam_size=1,
+                clip_timestamps=clips, batch_size=batch_size)
+            for segment in segments:
+                index = min(bisect.bisect_right(ends, segment.start), len(prepared) - 1)
+                texts[index].append((segment.start, segment.text))
+    return ["".join(text for _, text in sorted(parts)).strip() for parts in texts]
@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+"""
+WSGI entry point for the backend service.
+
+Usage:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from server import app
+
+__all__ = ["app"]